@@ -1,5 +1,33 @@
+import sys
+import types
+import importlib
+
 from .version import __version__, get_version
 
-from .litman_cmd import main as litman_main
-from .litman import LitMan, LitItem, ItemNotFound, load_config
-from .gen_journal_abbr_name import gen_journal_abbr_name_map, load_journal_abbr_name_map
+# Imported when first used rather than here, so that running a command (which
+# imports litman.litman_cmd, and so this) does not load litman.litman and its
+# dependencies unless the command needs them: `litman version` never does.
+_LAZY_ATTRS = {
+    'litman_main': ('.litman_cmd', 'main'),
+    'LitMan': ('.litman', 'LitMan'),
+    'LitItem': ('.litman', 'LitItem'),
+    'ItemNotFound': ('.litman', 'ItemNotFound'),
+    'load_config': ('.litman', 'load_config'),
+    'litman_options': ('.litman', 'litman_options'),
+    'gen_journal_abbr_name_map': ('.gen_journal_abbr_name', 'gen_journal_abbr_name_map'),
+    'load_journal_abbr_name_map': ('.gen_journal_abbr_name', 'load_journal_abbr_name_map'),
+}
+
+
+class _LazyModule(types.ModuleType):
+    # A module-level __getattr__ would do, but only from Python 3.7.
+    def __getattr__(self, name):
+        if name not in _LAZY_ATTRS:
+            raise AttributeError(f'module {self.__name__!r} has no attribute {name!r}')
+        module_name, attr = _LAZY_ATTRS[name]
+        value = getattr(importlib.import_module(module_name, self.__name__), attr)
+        setattr(self, name, value)
+        return value
+
+
+sys.modules[__name__].__class__ = _LazyModule
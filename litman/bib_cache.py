@@ -0,0 +1,102 @@
+"""Persistent cache of parsed ref.bib entries.
+
+Parsing with pybtex dominates whole-library commands (stats, cleanup-report,
+normalize, ...). Each ref.bib holds a single entry, which is cached as a plain
+record -- (key, type, fields, persons) -- keyed by the file's path, mtime and
+size, and written to <litman_dir>/data/bib_cache.marshal. A pybtex Entry is only
+rebuilt from a record when something asks for one.
+
+Enable with `bib_cache = true` in the [litman] section of .litmanrc.
+"""
+import os
+from logging import getLogger
+
+from litman import marshal_cache
+
+logger = getLogger('litman.bib_cache')
+
+BIB_CACHE_BASENAME = 'bib_cache.marshal'
+CACHE_VERSION = 1
+PERSON_PARTS = ['first_names', 'middle_names', 'prelast_names', 'last_names', 'lineage_names']
+
+
+def parse_record(bib_fn):
+    """(key, record) for the single entry in bib_fn."""
+    from pybtex.database import parse_file as parse_bib_file
+
+    bib_data = parse_bib_file(bib_fn)
+    assert len(bib_data.entries.keys()) == 1
+    key, entry = list(bib_data.entries.items())[0]
+    persons = {role: [[getattr(person, part) for part in PERSON_PARTS] for person in people]
+               for role, people in entry.persons.items()}
+    return key, (entry.type, list(entry.fields.items()), persons)
+
+
+def record_fields(record):
+    """A record's fields, keyed by lowercased field name."""
+    return {k.lower(): v for k, v in record[1]}
+
+
+def record_last_names(record, role='author'):
+    return [parts[PERSON_PARTS.index('last_names')] for parts in record[2].get(role, [])]
+
+
+def record_to_entry(record):
+    from pybtex.database import Entry, Person
+
+    entry_type, fields, persons = record
+    entry = Entry(entry_type, fields=fields)
+    for role, people in persons.items():
+        for parts in people:
+            person = Person()
+            for part, names in zip(PERSON_PARTS, parts):
+                setattr(person, part, list(names))
+            entry.add_person(person, role)
+    return entry
+
+
+class BibCache:
+    def __init__(self, cache_fn):
+        self.cache_fn = cache_fn
+        self._records = None
+        self._dirty = False
+
+    def __repr__(self):
+        return f"BibCache('{self.cache_fn}')"
+
+    def _load(self):
+        data = marshal_cache.load(self.cache_fn, CACHE_VERSION, 'bib cache')
+        self._records = data['records'] if data else {}
+
+    def load(self, bib_fn):
+        """(key, record) for bib_fn, parsing it only if it has changed since it was cached."""
+        if self._records is None:
+            self._load()
+        st = os.stat(bib_fn)
+        cached = self._records.get(bib_fn)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2], cached[3]
+
+        logger.debug(f'parsing {bib_fn}')
+        key, record = parse_record(bib_fn)
+        if not marshal_cache.is_racy(st.st_mtime_ns):
+            self._records[bib_fn] = (st.st_mtime_ns, st.st_size, key, record)
+            self._dirty = True
+        else:
+            self._records.pop(bib_fn, None)
+        return key, record
+
+    def save(self, keep_fns=None):
+        """Write out the cache, first dropping any ref.bib not in keep_fns (if given)."""
+        if self._records is None:
+            return
+        if keep_fns is not None:
+            keep_fns = set(keep_fns)
+            for bib_fn in [bib_fn for bib_fn in self._records if bib_fn not in keep_fns]:
+                del self._records[bib_fn]
+                self._dirty = True
+        if not self._dirty:
+            return
+        marshal_cache.save(self.cache_fn, CACHE_VERSION, records=self._records)
+        self._dirty = False
+        logger.debug(f'saved {len(self._records)} records to {self.cache_fn}')
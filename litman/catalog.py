@@ -0,0 +1,108 @@
+"""Persistent SQLite catalog of item metadata.
+
+Stores, per item: its has_* flags, tags, the bib-derived fields that `litman list`
+and `litman stats` show (year, authors, title, DOI, journal) and the mtimes of the
+item dir and of the files those values are read from. A scan only rebuilds an
+item from its directory when one of those mtimes has changed. An item any of
+whose files was modified too recently for its mtime to be trusted (see
+marshal_cache.is_racy) is not written, and so is rebuilt on the next scan.
+
+Lives at <litman_dir>/data/catalog.sqlite. Enable with `catalog = true` in the
+[litman] section of .litmanrc.
+"""
+import sys
+import json
+from logging import getLogger
+
+from litman import marshal_cache
+
+logger = getLogger('litman.catalog')
+
+CATALOG_BASENAME = 'catalog.sqlite'
+# Bump when the schema changes; an out of date catalog is dropped and rebuilt.
+SCHEMA_VERSION = 1
+
+FLAGS = ['has_title_file', 'has_summary', 'has_pdf', 'has_bib',
+         'has_extracted_text', 'has_tags', 'has_notes']
+# The files (besides the item dir itself) whose contents end up in a catalog row.
+MTIME_FNS = {'tags_mtime': 'tags.txt', 'bib_mtime': 'ref.bib', 'title_mtime': 'title.txt'}
+MTIMES = ['dir_mtime'] + list(MTIME_FNS)
+META = ['year', 'authors', 'title', 'doi', 'journal']
+COLUMNS = ['name'] + MTIMES + FLAGS + ['tags'] + META
+
+
+class Catalog:
+    def __init__(self, catalog_fn):
+        # Imported here, as this module is imported at startup for FLAGS and MTIME_FNS.
+        import sqlite3
+
+        self.catalog_fn = catalog_fn
+        # Not tied to the opening thread: the web app rescans from whichever request
+        # thread comes first, holding a lock so that only one uses it at a time.
+        self._conn = sqlite3.connect(catalog_fn, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            logger.debug(f'catalog schema {version} != {SCHEMA_VERSION}: rebuilding')
+            self._conn.execute('DROP TABLE IF EXISTS items')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            'name TEXT PRIMARY KEY, '
+            + ', '.join(f'{c} INTEGER' for c in MTIMES + FLAGS)
+            + ', tags TEXT, year INTEGER, authors TEXT, title TEXT, doi TEXT, journal TEXT)')
+        self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._conn.commit()
+
+    def __repr__(self):
+        return f"Catalog('{self.catalog_fn}')"
+
+    def rows(self):
+        """{name: row} for every item in the catalog."""
+        return {row['name']: row for row in self._conn.execute('SELECT * FROM items')}
+
+    def update(self, items, removed=()):
+        """Write (item, mtimes) pairs and drop the names in removed, in one transaction."""
+        records = [_record(item, mtimes) for item, mtimes in items
+                   if not any(mtime is not None and marshal_cache.is_racy(mtime)
+                              for mtime in mtimes)]
+        with self._conn:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO items ({", ".join(COLUMNS)}) '
+                f'VALUES ({", ".join("?" * len(COLUMNS))})', records)
+            self._conn.executemany('DELETE FROM items WHERE name = ?',
+                                   [(name,) for name in removed])
+        if records or removed:
+            logger.debug(f'catalog: {len(records)} updated, {len(removed)} removed')
+
+    def close(self):
+        self._conn.close()
+
+
+def row_mtimes(row):
+    return tuple(row[c] for c in MTIMES)
+
+
+def row_tags(row):
+    return [sys.intern(tag) for tag in json.loads(row['tags'])]
+
+
+def row_meta(row):
+    """The cached bib-derived values, or None if they could not be computed at scan time."""
+    if row['authors'] is None:
+        return None
+    meta = {key: row[key] for key in META}
+    meta['authors'] = json.loads(meta['authors'])
+    return meta
+
+
+def _record(item, mtimes):
+    try:
+        meta = item.meta()
+    except Exception as ex:
+        # e.g. a ref.bib with no year or title; the item falls back to reading its files.
+        logger.debug(f'{item.name}: not caching metadata: {ex}')
+        meta = {key: None for key in META}
+    else:
+        meta['authors'] = json.dumps(meta['authors'])
+    return ([item.name] + list(mtimes) + [int(getattr(item, flag)) for flag in FLAGS]
+            + [json.dumps(item.tags)] + [meta[key] for key in META])
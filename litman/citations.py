@@ -84,7 +84,7 @@ def _bib_fields(item):
 def scan_corpus(litman):
     """{name: {'doi', 'title'}} for every item in the collection."""
     return {item.name: dict(zip(('doi', 'title'), _bib_fields(item)))
-            for item in litman.get_items()}
+            for item in litman.iter_items()}
 
 
 # --- Semantic Scholar: citation counts ---
@@ -1,39 +1,51 @@
+"""litman subcommands, one module per command.
+
+Only the module for the command being run is imported. The help shown by
+`litman -h` comes from the manifest below, so it has to be kept in step with
+the first line of each module's docstring.
+"""
 import importlib
 from collections import OrderedDict
 from logging import getLogger
 
 logger = getLogger('litman.cmds')
 
-commands = [
-    'check-bib',
-    'check-titles',
-    'citation-graph',
-    'cleanup-report',
-    'display',
-    'edit',
-    'find-doi',
-    'gen-bib',
-    'import-bib',
-    'import-pdf',
-    'list',
-    'normalize',
-    'open-doi',
-    'search',
-    'shell',
-    'show',
-    'stats',
-    'summarize',
-    'themes',
-    'version',
-    'word-index',
-]
+commands = OrderedDict([
+    ('check-bib', 'Check .bib bibtex file'),
+    ('check-titles', 'Check all titles, and let user modify them'),
+    ('citation-graph', 'Build the internal citation network (Semantic Scholar + OpenAlex)'),
+    ('cleanup-report', 'Report bibliographic inconsistencies across the whole database'),
+    ('compact-text', 'Compress (or uncompress) extracted text as text_compression says'),
+    ('daemon', 'Keep the library scanned in memory and answer other litman commands'),
+    ('display', 'Dislpay a given litman item'),
+    ('edit', 'Edit a field for a given litman item'),
+    ('find-doi', 'Find missing DOIs via CrossRef (dry run by default; --apply writes them)'),
+    ('gen-bib', 'Generate .bib bibtex file from citations in .tex files'),
+    ('import-bib', 'Import items from parsing bibtex .bib files'),
+    ('import-pdf', 'Import items from PDF filenames (and fetch their BibTeX from CrossRef)'),
+    ('list', 'List all items'),
+    ('normalize', 'Normalize DOI formats and journal-name capitalization (dry run by default)'),
+    ('open-doi', 'Open DOI for a given litman item'),
+    ('search', 'Search through extracted test for <search_str>'),
+    ('shell', 'Launches IPython shell'),
+    ('show', 'Show information about a given item'),
+    ('stats', 'Get some stats on all files'),
+    ('summarize', "Summarize each paper's extracted text with Claude (Batch API)"),
+    ('themes', 'Synthesize recurring themes across all paper summaries with Claude'),
+    ('version', 'Print version info'),
+    ('word-index', 'Build a word-frequency / inverted index across all extracted text'),
+])
+
 
-modules = OrderedDict()
-for command in commands:
+def load(command):
+    """Import and return the module for command.
+
+    Only called for the command being run, so a module that cannot be imported
+    (e.g. for want of an optional dependency) stops only its own command.
+    """
     command_name = 'cmds.' + command.replace('-', '_')
     try:
-        modules[command] = importlib.import_module('litman.' + command_name)
-    except ImportError as e:
-        logger.warning('Cannot load module {}'.format(command_name))
-        logger.warning(e)
-
+        return importlib.import_module('litman.' + command_name)
+    except ImportError:
+        logger.error('Cannot load module {}'.format(command_name))
+        raise
@@ -2,9 +2,12 @@
 import re
 from logging import getLogger
 
+from litman.completion import tag_query_completer
+
 logger = getLogger('litman.cmds')
 
-ARGS = [(['--tag-filter', '-t'], {'help': 'tag to filter on', 'default': None})]
+ARGS = [(['--tag-filter', '-t'], {'help': 'tag expression to filter on (e.g. "a AND (b OR c)")', 'default': None,
+                                  'completer': tag_query_completer})]
 
 
 def enter_title(item):
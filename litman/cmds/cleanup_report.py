@@ -1,6 +1,9 @@
 """Report bibliographic inconsistencies across the whole database"""
+from litman.completion import tag_query_completer
 
-ARGS = [(['--tag-filter', '-t'], {'help': 'Only items carrying this tag', 'default': None})]
+ARGS = [(['--tag-filter', '-t'], {'help': 'Only items matching this tag expression (e.g. "a AND (b OR c)")',
+                                  'default': None,
+                                  'completer': tag_query_completer})]
 
 
 def main(litman, args):
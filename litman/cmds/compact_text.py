@@ -0,0 +1,18 @@
+"""Compress (or uncompress) extracted text as text_compression says"""
+from litman.completion import tag_query_completer
+from litman.text_store import SUFFIXES
+
+ARGS = [
+    (['--compression', '-c'], {'choices': list(SUFFIXES), 'default': None,
+                               'help': 'Compression to use (default: text_compression from '
+                                       '.litmanrc, or none)'}),
+    (['--tag-filter', '-t'], {'help': 'Only items matching this tag expression (e.g. "a AND (b OR c)")',
+                              'default': None,
+                              'completer': tag_query_completer}),
+]
+
+
+def main(litman, args):
+    n_converted, size_before, size_after = litman.compact_text(args.compression, args.tag_filter)
+    mb = 1024 * 1024
+    print(f'{n_converted} items converted: {size_before / mb:.1f} MB -> {size_after / mb:.1f} MB')
@@ -0,0 +1,19 @@
+"""Keep the library scanned in memory and answer other litman commands"""
+from litman.daemon import Daemon, request
+
+ARGS = [(['--stop'], {'help': 'stop the running daemon', 'action': 'store_true'}),
+        (['--status'], {'help': 'report whether a daemon is running', 'action': 'store_true'})]
+
+
+def main(litman, args):
+    if args.stop or args.status:
+        reply = request(litman.litman_dir, {'op': 'stop' if args.stop else 'ping'})
+        if reply is None:
+            print('No daemon running')
+        elif args.stop:
+            print('Daemon stopped')
+        else:
+            print(f'Daemon running on {Daemon(litman).sock_fn}')
+        return
+
+    Daemon(litman).serve()
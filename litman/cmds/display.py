@@ -1,7 +1,9 @@
 """Dislpay a given litman item"""
+from litman.completion import item_completer
 from litman.litman import ItemNotFound
 
-ARGS = [(['list_items'], {'nargs': '+', 'help': 'Display list item'})]
+ARGS = [(['list_items'], {'nargs': '+', 'help': 'Display list item',
+                           'completer': item_completer})]
 
 
 def main(litman, args):
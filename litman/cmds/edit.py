@@ -1,8 +1,9 @@
 """Edit a field for a given litman item"""
 import subprocess as sp
+from litman.completion import item_completer
 from litman.litman import ItemNotFound
 
-ARGS = [(['list_item'], {'nargs': 1, 'help': 'List item to edit'}),
+ARGS = [(['list_item'], {'nargs': 1, 'help': 'List item to edit', 'completer': item_completer}),
         (['field'], {'nargs': 1, 'help': 'Field to edit'})]
 
 
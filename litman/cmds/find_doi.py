@@ -2,14 +2,18 @@
 import time
 from logging import getLogger
 
+from litman.completion import item_completer, tag_query_completer
 from litman.doi_lookup import crossref_lookup, parse_report
 from litman.litman import load_config, ItemNotFound
 
 logger = getLogger('litman.find_doi')
 
 ARGS = [
-    (['item_name'], {'nargs': '?', 'help': 'Single item to look up (default: all missing a DOI)'}),
-    (['--tag-filter', '-t'], {'help': 'Only items carrying this tag', 'default': None}),
+    (['item_name'], {'nargs': '?', 'help': 'Single item to look up (default: all missing a DOI)',
+                      'completer': item_completer}),
+    (['--tag-filter', '-t'], {'help': 'Only items matching this tag expression (e.g. "a AND (b OR c)")',
+                              'default': None,
+                              'completer': tag_query_completer}),
     (['--articles-only', '-A'], {'help': 'Only @article entries', 'action': 'store_true'}),
     (['--apply', '-a'], {'help': 'Write CONFIDENT DOIs into ref.bib', 'action': 'store_true'}),
     (['--apply-from'], {'help': 'Apply DOIs from a saved dry-run report (no querying)', 'default': None}),
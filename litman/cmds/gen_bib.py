@@ -1,7 +1,10 @@
 """Generate .bib bibtex file from citations in .tex files"""
 import os
 
-ARGS = [(['--tag-filter', '-t'], {'help': 'tag to filter on', 'default': None}),
+from litman.completion import tag_query_completer
+
+ARGS = [(['--tag-filter', '-t'], {'help': 'tag expression to filter on (e.g. "a AND (b OR c)")', 'default': None,
+                                  'completer': tag_query_completer}),
         (['--outfile', '-o'], {'help': 'Name of output file'}),
         (['--dry-run', '-d'], {'help': 'Dry run only', 'action': 'store_true'}),
         (['--no-rename-title', '-n'], {'help': 'Do not rename titles of entries', 'action': 'store_true'}),
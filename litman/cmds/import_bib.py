@@ -1,6 +1,9 @@
 """Import items from parsing bibtex .bib files"""
+from litman.completion import tag_completer
+
 ARGS = [(['dir'], {'nargs': 1, 'help': 'Directory to import from'}),
-        (['--tag', '-t'], {'help': 'tag to add to citations', 'default': None})]
+        (['--tag', '-t'], {'help': 'tag to add to citations', 'default': None,
+                            'completer': tag_completer})]
 
 
 def main(litman, args):
@@ -1,9 +1,12 @@
 """Import items from PDF filenames (and fetch their BibTeX from CrossRef)"""
+from litman.completion import project_completer, tags_completer
 from litman.litman import load_config
 
 ARGS = [(['dir'], {'nargs': 1, 'help': 'Directory to import from'}),
-        (['--tags', '-t'], {'help': 'comma separated tags', 'default': ''}),
-        (['--project', '-p'], {'help': 'project to add to', 'default': None}),
+        (['--tags', '-t'], {'help': 'comma separated tags', 'default': '',
+                            'completer': tags_completer}),
+        (['--project', '-p'], {'help': 'project to add to', 'default': None,
+                               'completer': project_completer}),
         (['--no-fetch-bib'], {'action': 'store_true',
                               'help': "Don't look up a BibTeX entry from CrossRef on import"}),
         (['--mailto', '-m'], {'help': 'Email for CrossRef polite pool', 'default': None})]
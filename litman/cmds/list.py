@@ -1,8 +1,12 @@
 """List all items"""
-ARGS = [(['--tag-filter', '-t'], {'help': 'tag to filter on', 'default': None}),
+from litman.completion import tag_query_completer
+
+ARGS = [(['--tag-filter', '-t'], {'help': 'tag expression to filter on (e.g. "a AND (b OR c)")', 'default': None,
+                                  'completer': tag_query_completer}),
         (['--has-filters'], {'help': 'has attr filter on (comma sep, e.g. <has>=True)', 'default': None}),
-        (['--sort-on', '-s'], {'help': 'list to sort on (comma separated)', 'default': 'name'}),
+        (['--sort-on', '-s'], {'help': 'keys to sort on, first takes priority (comma separated)', 'default': 'name'}),
         (['--reverse', '-r'], {'help': 'reverse order', 'action': 'store_true'})]
+DAEMON_OK = True
 
 
 def main(litman, args):
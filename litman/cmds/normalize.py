@@ -1,8 +1,11 @@
 """Normalize DOI formats and journal-name capitalization (dry run by default)"""
+from litman.completion import tag_query_completer
 
 ARGS = [
     (['--apply', '-a'], {'help': 'Write changes to ref.bib (default: dry run)', 'action': 'store_true'}),
-    (['--tag-filter', '-t'], {'help': 'Only items carrying this tag', 'default': None}),
+    (['--tag-filter', '-t'], {'help': 'Only items matching this tag expression (e.g. "a AND (b OR c)")',
+                              'default': None,
+                              'completer': tag_query_completer}),
 ]
 
 
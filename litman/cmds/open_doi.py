@@ -1,7 +1,8 @@
 """Open DOI for a given litman item"""
+from litman.completion import item_completer
 from litman.litman import ItemNotFound
 
-ARGS = [(['list_item'], {'nargs': 1, 'help': 'Open DOI for item'})]
+ARGS = [(['list_item'], {'nargs': 1, 'help': 'Open DOI for item', 'completer': item_completer})]
 
 
 def main(litman, args):
@@ -1,32 +1,108 @@
 """Search through extracted test for <search_str>"""
+import os
+import sys
+import itertools
 import re
+from contextlib import closing
+from operator import itemgetter
 
+from litman import search_index
 from litman.setup_logging import bcolors
 
 
 ARGS = [(['search_str'], {'nargs': 1, 'help': 'Term to search for'}),
         (['--ignore-case', '-i'], {'help': 'Ignore case when searching', 'action': 'store_true'}),
         (['--num-matches-only', '-n'], {'help': 'Only show number of matches', 'action':'store_true'}),
+        (['--names-only', '-l'], {'help': 'Only show the names of items that match',
+                                  'action': 'store_true'}),
+        (['--max-results'], {'help': 'Stop after this many matches', 'type': int}),
+        (['--max-items'], {'help': 'Stop after this many matching items', 'type': int}),
+        (['--rank', '-r'], {'help': 'Show the items most relevant to the words in search_str '
+                                    '(BM25, from the search index built by word-index), best '
+                                    'first; --max-items of them (default 10)',
+                            'action': 'store_true'}),
+        (['--words', '-w'], {'help': 'Search for a word or phrase in the search index '
+                                     '(built by word-index); ignores case', 'action': 'store_true'}),
+        (['--jobs', '-j'], {'help': 'Processes to search with, at most one per CPU '
+                                    '(default: search_workers from .litmanrc, or 1)',
+                            'type': int}),
         (['--context', '-c'], {'help': 'Amount of context chars to include', 'type':int, 'default': 30})]
+DAEMON_OK = True
 
 
 def main(litman, args):
-    all_matches = litman.search(args.search_str[0], args.ignore_case)
-    for item, matches in all_matches:
-        if args.num_matches_only:
-            print(f'{item.name}:{len(matches)}')
+    if args.rank:
+        _print_ranked(litman, args)
+        return
+
+    matches = litman.iter_search(args.search_str[0], args.ignore_case, words=args.words,
+                                 workers=args.jobs, first_only=args.names_only)
+    try:
+        _print_matches(matches, _highlight_pattern(args), args)
+    except BrokenPipeError:
+        # e.g. `litman search ... | head`: the reader has all it wants. Not killed by
+        # SIGPIPE, so that any search worker processes are shut down.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+
+def _highlight_pattern(args):
+    """The regex for the matches to highlight in each match's context: the search's own."""
+    flags = re.MULTILINE | re.DOTALL
+    if args.words:
+        terms = [term for term, _, _ in search_index.tokenize(args.search_str[0])]
+        return re.compile(search_index.phrase_regex(terms), flags | re.IGNORECASE)
+    if args.ignore_case:
+        flags |= re.IGNORECASE
+    return re.compile(args.search_str[0], flags)
+
+
+def _print_matches(matches, pattern, args):
+    # Closing stops the search as soon as the limits are reached.
+    with closing(matches):
+        matches = itertools.islice(matches, args.max_results)
+        by_item = itertools.islice(itertools.groupby(matches, key=itemgetter(0)), args.max_items)
+        for item, item_matches in by_item:
+            if args.names_only:
+                print(item.name)
+                continue
+            if args.num_matches_only:
+                print(f'{item.name}:{sum(1 for _ in item_matches)}')
+                continue
+
+            text = item.read_extracted_text()
+            for _, (start, end) in item_matches:
+                print(item.name + ':' + _highlight(text, start, end, args.context, pattern))
+
+
+def _highlight(text, start, end, context, pattern=None):
+    """text[start:end] with context chars either side, on one line; the match, and any
+    other matches of pattern that are wholly in the context, in colour."""
+    context_start = max(start - context, 0)
+    context_end = min(end + context, len(text))
+    spans = [(start, end)]
+    if pattern is not None:
+        spans.extend(m.span() for m in pattern.finditer(text, context_start, context_end)
+                     if m.end() > m.start() and (m.end() <= start or m.start() >= end))
+    parts = []
+    pos = context_start
+    for span_start, span_end in sorted(spans):
+        if span_start < pos:
             continue
+        parts.append(text[pos:span_start])
+        parts.append(bcolors.BOLD + bcolors.OKBLUE + text[span_start:span_end] + bcolors.ENDC)
+        pos = span_end
+    parts.append(text[pos:context_end])
+    return ''.join(parts).replace('\n', '')
+
 
-        for match in matches:
-            span = match.span()
-            start_index = max(span[0] - args.context, 0)
-            end_index = min(span[1] + args.context, len(item.extracted_text()))
-            match_with_context = item.extracted_text()[start_index:end_index]
-            if args.ignore_case:
-                flags =  re.IGNORECASE
-            else:
-                flags = 0
-            match = re.search(args.search_str[0], match_with_context, flags=flags).group()
-            colour_sub = bcolors.BOLD + bcolors.OKBLUE + match + bcolors.ENDC
-            print(item.name + ':', end='')
-            print(re.sub(args.search_str[0], colour_sub, match_with_context.replace('\n', ''), flags=flags))
+def _print_ranked(litman, args):
+    top_k = 10 if args.max_items is None else args.max_items
+    for item, score, span in litman.rank_search(args.search_str[0], top_k):
+        if args.names_only:
+            print(item.name)
+        elif span is None:
+            print(f'{item.name}:{score:.2f}')
+        else:
+            text = item.read_extracted_text()
+            print(f'{item.name}:{score:.2f}:' + _highlight(text, *span, args.context))
@@ -8,11 +8,11 @@ def main(litman, args):
     if not args.failsafe:
         # Load up useful modules
         import litman
-        from litman import LitMan, LitItem, load_config, ItemNotFound
+        from litman import LitMan, LitItem, load_config, litman_options, ItemNotFound
 
         print(80 * '=')
         _, conf = load_config()
-        lm = LitMan(conf['litman_dir'])
+        lm = LitMan(conf['litman_dir'], **litman_options(conf))
         print('Created LitMan object: lm')
         print(80 * '=')
         print('')
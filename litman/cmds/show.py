@@ -1,7 +1,10 @@
 """Show information about a given item"""
+from litman.completion import item_completer
 from litman.litman import ItemNotFound
 
-ARGS = [(['list_item'], {'nargs': 1, 'help': 'Show information about a list item'})]
+ARGS = [(['list_item'], {'nargs': 1, 'help': 'Show information about a list item',
+                            'completer': item_completer})]
+DAEMON_OK = True
 
 
 def main(litman, args):
@@ -2,6 +2,11 @@
 ARGS = [(['--plot', '-p'], {'help': 'Plot years', 'action': 'store_true'}) ]
 
 
+def DAEMON_OK(args):
+    # The plot has to be drawn by the calling process.
+    return not args.plot
+
+
 def main(litman, args):
     stats = litman.stats()
     for key, stat in stats.items():
@@ -4,10 +4,14 @@ import json
 import time
 from logging import getLogger
 
+from litman.completion import tag_query_completer
+
 logger = getLogger('litman.summarize')
 
 ARGS = [
-    (['--tag-filter', '-t'], {'default': None, 'help': 'Only items carrying this tag'}),
+    (['--tag-filter', '-t'], {'default': None,
+                              'help': 'Only items matching this tag expression (e.g. "a AND (b OR c)")',
+                              'completer': tag_query_completer}),
     (['--force', '-f'], {'action': 'store_true',
                          'help': 'Re-summarize items that already have summary.json'}),
     (['--limit'], {'type': int, 'default': None, 'help': 'Cap number of items (e.g. a pilot run)'}),
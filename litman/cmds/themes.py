@@ -1,9 +1,13 @@
 """Synthesize recurring themes across all paper summaries with Claude"""
 import os
 
+from litman.completion import tag_query_completer
+
 
 ARGS = [
-    (['--tag-filter', '-t'], {'default': None, 'help': 'Only items carrying this tag'}),
+    (['--tag-filter', '-t'], {'default': None,
+                              'help': 'Only items matching this tag expression (e.g. "a AND (b OR c)")',
+                              'completer': tag_query_completer}),
     (['--outfile', '-o'], {'default': None,
                            'help': 'Write report here (default: <litman_dir>/themes.md)'}),
 ]
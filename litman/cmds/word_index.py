@@ -2,18 +2,30 @@
 import os
 import json
 
-from litman.word_index import build_word_index
+from litman.completion import tag_query_completer
+from litman.word_index import WORD_COUNTS_BASENAME, WordCountCache, build_word_index
 
 ARGS = [
     (['--min-count', '-m'], {'type': int, 'default': 3, 'help': 'Drop words rarer than this'}),
-    (['--tag-filter', '-t'], {'default': None, 'help': 'Only items carrying this tag'}),
+    (['--tag-filter', '-t'], {'default': None,
+                              'help': 'Only items matching this tag expression (e.g. "a AND (b OR c)")',
+                              'completer': tag_query_completer}),
 ]
 
 
 def main(litman, args):
-    items = litman.get_items(args.tag_filter, has_extracted_text=True)
-    print(f'Indexing {len(items)} items with extracted text...')
-    index = build_word_index(items, min_count=args.min_count)
+    if litman.use_corpus:
+        # First, so that everything below reads the texts from it.
+        n_packed, n_removed = litman.update_corpus()
+        print(f'corpus: {n_packed} items packed, {n_removed} removed')
+
+    print('Indexing items with extracted text...')
+    cache = WordCountCache(litman.data_path(WORD_COUNTS_BASENAME))
+    index = build_word_index(litman.iter_items(args.tag_filter, has_extracted_text=True),
+                             min_count=args.min_count, cache=cache)
+    # Counts for items outside --tag-filter are kept for the next full build.
+    cache.save(keep_names=[item.name for item in litman.get_items(has_extracted_text=True)])
+    print(f'{cache.n_counted} items (re)counted')
 
     json_fn = litman.data_path('word_index.json')
     txt_fn = litman.data_path('word_index.txt')
@@ -28,3 +40,7 @@ def main(litman, args):
 
     print(f'{len(index)} terms -> {json_fn}')
     print(f'              -> {txt_fn} (grep-friendly, sorted by frequency)')
+
+    # The positional index behind `litman search -w` always covers every item.
+    n_indexed, n_removed = litman.update_search_index()
+    print(f'search index: {n_indexed} items (re)indexed, {n_removed} removed')
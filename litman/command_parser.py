@@ -1,3 +1,5 @@
+import os
+import shlex
 import argparse
 
 try:
@@ -7,6 +9,19 @@ except ImportError:
     use_argcomplete = False
 
 
+def _find_cmd_name(top_level_args, cmd_names, cmdline_args):
+    # The first word that is not a top-level option (or an option's value).
+    takes_value = {flag for flags, kwargs in top_level_args
+                   if 'action' not in kwargs for flag in flags}
+    cmdline_args = iter(cmdline_args)
+    for arg in cmdline_args:
+        if arg in takes_value:
+            next(cmdline_args, None)
+        elif not arg.startswith('-'):
+            return arg if arg in cmd_names else None
+    return None
+
+
 def parse_commands(name, top_level_args, module, cmdline_args):
     # create the top-level parser.
     parser = argparse.ArgumentParser(prog=name)
@@ -16,13 +31,33 @@ def parse_commands(name, top_level_args, module, cmdline_args):
     for top_level_pos_args, top_level_kwargs in top_level_args:
         parser.add_argument(*top_level_pos_args, **top_level_kwargs)
 
-    cmds = module.modules
-    for cmd_name, cmd_module in cmds.items():
+    if use_argcomplete and '_ARGCOMPLETE' in os.environ:
+        # Completing: the command line is in the environment rather than in cmdline_args.
+        comp_line = os.environ.get('COMP_LINE', '')
+        try:
+            words = shlex.split(comp_line)[1:]
+        except ValueError:
+            # e.g. an unclosed quote in the word being completed.
+            words = comp_line.split()[1:]
+    else:
+        words = cmdline_args
+    chosen_name = _find_cmd_name(top_level_args, module.commands, words)
+
+    # Every command gets a subparser (for `-h`), but only the chosen one's module
+    # is imported and gets its arguments.
+    cmds = {}
+    for cmd_name, cmd_help in module.commands.items():
         # create the subparser for each command.
-        subparser = subparsers.add_parser(cmd_name,
-                                          help=cmd_module.__doc__)
-        for cmd_pos_args, cmd_kwargs in cmd_module.ARGS:
-            subparser.add_argument(*cmd_pos_args, **cmd_kwargs)
+        subparser = subparsers.add_parser(cmd_name, help=cmd_help)
+        if cmd_name == chosen_name:
+            cmds[cmd_name] = module.load(cmd_name)
+            for cmd_pos_args, cmd_kwargs in cmds[cmd_name].ARGS:
+                # argcomplete completers are set on the action, not passed to argparse.
+                cmd_kwargs = dict(cmd_kwargs)
+                completer = cmd_kwargs.pop('completer', None)
+                action = subparser.add_argument(*cmd_pos_args, **cmd_kwargs)
+                if completer:
+                    action.completer = completer
 
     if use_argcomplete:
         argcomplete.autocomplete(parser)
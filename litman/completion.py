@@ -0,0 +1,96 @@
+"""argcomplete completers for item names, tags and projects.
+
+Completing must not scan the library, so item names and tags are read from
+<litman_dir>/data/completion_index.json, which LitMan rewrites (when it has
+changed) after a scan -- on close() for the CLI, and after each refresh in
+`litman daemon`. Projects are just the dirs in <litman_dir>/projects.
+
+Commands attach these through a 'completer' key in their ARGS kwargs.
+"""
+import os
+import json
+from bisect import bisect_left
+from logging import getLogger
+
+from litman.tag_query import KEYWORDS
+
+logger = getLogger('litman.completion')
+
+INDEX_BASENAME = 'completion_index.json'
+
+
+def write_index(index_fn, item_names, tags):
+    """Write the sorted item names and tags, unless index_fn already holds them."""
+    content = json.dumps({'items': sorted(item_names), 'tags': sorted(tags)})
+    try:
+        with open(index_fn, 'r') as f:
+            if f.read() == content:
+                return
+    except FileNotFoundError:
+        pass
+    tmp_fn = index_fn + '.tmp'
+    with open(tmp_fn, 'w') as f:
+        f.write(content)
+    os.replace(tmp_fn, index_fn)
+    logger.debug(f'wrote {index_fn}')
+
+
+def _litman_dir(parsed_args):
+    # As in litman_cmd: .litmanrc wins over --litman-dir.
+    from litman.litman import load_config
+
+    _, config = load_config()
+    if config:
+        return config['litman_dir']
+    return os.path.expandvars(parsed_args.litman_dir)
+
+
+def _read_index(parsed_args):
+    index_fn = os.path.join(_litman_dir(parsed_args), 'data', INDEX_BASENAME)
+    try:
+        with open(index_fn, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        # Not written yet: any command that scans (e.g. `litman list`) will write it.
+        return {'items': [], 'tags': []}
+
+
+def _prefix_matches(sorted_words, prefix):
+    lo = bisect_left(sorted_words, prefix)
+    hi = bisect_left(sorted_words, prefix + '\U0010ffff', lo)
+    return sorted_words[lo:hi]
+
+
+def _complete_last(prefix, words, separators):
+    # Complete the last word of e.g. "obs AND (mod" or "obs,mod", keeping the rest.
+    cut = max(prefix.rfind(sep) for sep in separators) + 1
+    head, last = prefix[:cut], prefix[cut:]
+    return [head + word for word in _prefix_matches(words, last)]
+
+
+def item_completer(prefix, parsed_args, **kwargs):
+    return _prefix_matches(_read_index(parsed_args)['items'], prefix)
+
+
+def tag_completer(prefix, parsed_args, **kwargs):
+    return _prefix_matches(_read_index(parsed_args)['tags'], prefix)
+
+
+def tags_completer(prefix, parsed_args, **kwargs):
+    """For comma separated tags."""
+    return _complete_last(prefix, _read_index(parsed_args)['tags'], ',')
+
+
+def tag_query_completer(prefix, parsed_args, **kwargs):
+    """For tag expressions (see litman.tag_query)."""
+    words = sorted(_read_index(parsed_args)['tags'] + KEYWORDS)
+    return _complete_last(prefix, words, ' ()')
+
+
+def project_completer(prefix, parsed_args, **kwargs):
+    projects_dir = os.path.join(_litman_dir(parsed_args), 'projects')
+    try:
+        projects = sorted(entry.name for entry in os.scandir(projects_dir) if entry.is_dir())
+    except FileNotFoundError:
+        return []
+    return _prefix_matches(projects, prefix)
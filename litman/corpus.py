@@ -0,0 +1,176 @@
+"""Packed copy of every item's extracted text, read through mmap.
+
+Opening thousands of small extracted_text.txt files dominates search,
+word-index and the other commands that read all the text. The corpus holds
+every text, UTF-8 encoded, end to end in one file, with a table of
+{item name: (offset, length, mtime_ns, size)} alongside it; a text is then a
+slice of one mmap, decoded straight from the mapped pages. An entry is only
+used while its extracted_text.txt still has the recorded mtime and size, so
+anything that has changed since the last update is read from its file.
+
+Updates (`litman word-index`) append the texts that have changed. The space
+left by replaced or dropped texts is reclaimed by rewriting the corpus once it
+is over COMPACT_FRACTION dead. Each rewrite goes to a new corpus-<generation>.bin,
+named in the offsets table, so that the table never points into the wrong file
+and a process can keep reading the corpus it has mapped.
+
+Lives in <litman_dir>/data. Enable with `corpus = true` in the [litman] section
+of .litmanrc.
+"""
+import os
+import glob
+from logging import getLogger
+
+from litman import marshal_cache, text_store
+
+logger = getLogger('litman.corpus')
+
+OFFSETS_BASENAME = 'corpus_offsets.marshal'
+CORPUS_VERSION = 1
+COMPACT_FRACTION = 0.5
+
+
+def corpus_basename(generation):
+    return f'corpus-{generation}.bin'
+
+
+class Corpus:
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.offsets_fn = os.path.join(data_dir, OFFSETS_BASENAME)
+        self._generation = 0
+        # {item name: (offset, length, mtime_ns, size)}
+        self._entries = None
+        self._mmap = None
+
+    def __repr__(self):
+        return f"Corpus('{self.data_dir}')"
+
+    def _corpus_fn(self, generation=None):
+        if generation is None:
+            generation = self._generation
+        return os.path.join(self.data_dir, corpus_basename(generation))
+
+    def _load(self):
+        data = marshal_cache.load(self.offsets_fn, CORPUS_VERSION, 'corpus offsets')
+        self._entries = {}
+        if data:
+            self._generation = data['generation']
+            self._entries = data['entries']
+
+    def entries(self):
+        if self._entries is None:
+            self._load()
+        return self._entries
+
+    def location(self, item):
+        """(corpus filename, offset, length) of item's text, if it is current."""
+        entry = self.entries().get(item.name)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(item.extracted_text_fn)
+        except FileNotFoundError:
+            return None
+        if entry[2:] != (st.st_mtime_ns, st.st_size):
+            return None
+        return self._corpus_fn(), entry[0], entry[1]
+
+    def text(self, item):
+        """item's extracted text, or None if it is not in the corpus or has changed."""
+        location = self.location(item)
+        if location is None:
+            return None
+        if self._mmap is None:
+            try:
+                self._mmap = map_corpus(location[0])
+            except FileNotFoundError:
+                logger.warning(f'missing {location[0]}: run `litman word-index` to rebuild it')
+                self._entries = {}
+                return None
+        return read_text(self._mmap, *location[1:])
+
+    def update(self, items):
+        """Pack the texts of items that have changed, and drop any not in items."""
+        entries = dict(self.entries())
+        corpus_fn = self._corpus_fn()
+        end = os.path.getsize(corpus_fn) if os.path.exists(corpus_fn) else 0
+        names = set()
+        n_packed = 0
+        with open(corpus_fn, 'ab') as f:
+            for item in items:
+                names.add(item.name)
+                try:
+                    st = os.stat(item.extracted_text_fn)
+                except FileNotFoundError:
+                    continue
+                entry = entries.get(item.name)
+                if entry is not None and entry[2:] == (st.st_mtime_ns, st.st_size):
+                    continue
+                if marshal_cache.is_racy(st.st_mtime_ns):
+                    entries.pop(item.name, None)
+                    continue
+                data = text_store.read_text(item.extracted_text_fn).encode()
+                f.write(data)
+                entries[item.name] = (end, len(data), st.st_mtime_ns, st.st_size)
+                end += len(data)
+                n_packed += 1
+        removed = [name for name in entries if name not in names]
+        for name in removed:
+            del entries[name]
+
+        live = sum(entry[1] for entry in entries.values())
+        if end and (end - live) / end > COMPACT_FRACTION:
+            self._compact(entries)
+        elif n_packed or removed:
+            self._save(entries)
+        logger.debug(f'corpus: {n_packed} packed, {len(removed)} removed')
+        return n_packed, len(removed)
+
+    def _compact(self, entries):
+        old_fn = self._corpus_fn()
+        new_fn = self._corpus_fn(self._generation + 1)
+        compacted = {}
+        pos = 0
+        with open(old_fn, 'rb') as old_f, open(new_fn, 'wb') as new_f:
+            for name, (offset, length, mtime_ns, size) in sorted(entries.items(),
+                                                                 key=lambda kv: kv[1][0]):
+                old_f.seek(offset)
+                new_f.write(old_f.read(length))
+                compacted[name] = (pos, length, mtime_ns, size)
+                pos += length
+        self._generation += 1
+        self._save(compacted)
+        logger.debug(f'compacted corpus into {new_fn}')
+
+    def _save(self, entries):
+        marshal_cache.save(self.offsets_fn, CORPUS_VERSION, generation=self._generation,
+                           entries=entries)
+        self._entries = entries
+        self.close()
+        # Earlier generations are no longer named in the offsets table.
+        current_fn = self._corpus_fn()
+        for fn in glob.glob(os.path.join(self.data_dir, corpus_basename('*'))):
+            if fn != current_fn:
+                os.remove(fn)
+
+    def close(self):
+        # map_corpus gives b'' for an empty corpus, which has nothing to close.
+        if self._mmap:
+            self._mmap.close()
+        self._mmap = None
+
+
+def map_corpus(corpus_fn):
+    import mmap
+
+    with open(corpus_fn, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_text(mapped, offset, length):
+    # Slicing the memoryview does not copy; decoding is the only copy made.
+    with memoryview(mapped) as view, view[offset:offset + length] as text_view:
+        return str(text_view, 'utf-8')
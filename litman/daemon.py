@@ -0,0 +1,245 @@
+"""Serve a scanned, up to date LitMan over a Unix socket.
+
+`litman daemon` scans the library once and then keeps it current using a watcher
+(see litman.watch), so that commands run through it skip the scan. The socket is
+<litman_dir>/data/daemon.sock. Each request and reply is one line of JSON:
+
+    {"op": "tags"}                                 -> {"ok": true, "tags": [[tag, count], ...]}
+    {"op": "list", "tag_filter": "obs"}            -> {"ok": true, "items": [name, ...]}
+    {"op": "get_item", "name": "smith2001"}        -> {"ok": true, "item": {...}}
+    {"op": "search", "pattern": "cold pools?"}     -> {"ok": true, "matches": [[name, spans], ...]}
+    {"op": "stop"}
+
+Failures come back as {"ok": false, "error": "...", "error_type": "ValueError"}.
+
+litman_cmd sends "run" for commands that set DAEMON_OK, whenever a daemon is
+running. Its output is streamed as it is printed, in {"output": "..."} lines,
+before the final {"ok": ...} line, so that `litman list | head` sees the first
+rows straight away (and a reader that goes away stops the command).
+"""
+import os
+import json
+import select
+import signal
+import socket
+from contextlib import closing, redirect_stdout
+from logging import getLogger
+
+from litman.watch import make_watcher
+
+logger = getLogger('litman.daemon')
+
+SOCKET_BASENAME = 'daemon.sock'
+# A client that connects but does not send its request (or stops reading the
+# reply) is dropped after this long.
+CLIENT_TIMEOUT = 5
+# Characters of a command's output sent to the client in each "output" line.
+OUTPUT_CHUNK = 8192
+
+
+class ClientGone(ConnectionError):
+    """The client stopped reading a command's output. Not a BrokenPipeError, which
+    commands handle for their own stdout."""
+
+
+def socket_fn(litman_dir):
+    return os.path.join(litman_dir, 'data', SOCKET_BASENAME)
+
+
+def replies(litman_dir, message):
+    """Send message to the daemon for litman_dir, and generate its reply lines;
+    nothing if no daemon is running."""
+    sock_fn = socket_fn(litman_dir)
+    if not os.path.exists(sock_fn):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(sock_fn)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Left behind by a daemon that did not shut down cleanly.
+            logger.debug(f'no daemon listening on {sock_fn}')
+            return
+        sock.sendall(json.dumps(message).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def request(litman_dir, message):
+    """Send message to the daemon for litman_dir; None if no daemon is running."""
+    with closing(replies(litman_dir, message)) as reply_lines:
+        return next(reply_lines, None)
+
+
+def daemon_ok(cmd, args):
+    """Whether cmd can be run by the daemon: its module sets DAEMON_OK, which is
+    either a bool or a function of the parsed args."""
+    ok = getattr(cmd, 'DAEMON_OK', False)
+    return ok(args) if callable(ok) else ok
+
+
+def _item_dict(item):
+    return {'name': item.name, 'title': item.title(), 'authors': item.get_authors(),
+            'year': item.year(), 'doi_url': item.doi_url(),
+            'tags': item.tags, 'has_pdf': item.has_pdf, 'has_bib': item.has_bib,
+            'has_extracted_text': item.has_extracted_text}
+
+
+class _OutputWriter:
+    """stdout for a command run by the daemon: sends what is printed to the client."""
+    def __init__(self, conn):
+        self.conn = conn
+        self._chunks = []
+        self._size = 0
+
+    def write(self, text):
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= OUTPUT_CHUNK:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if not self._chunks:
+            return
+        line = json.dumps({'output': ''.join(self._chunks)}).encode() + b'\n'
+        self._chunks = []
+        self._size = 0
+        try:
+            # MSG_NOSIGNAL: a command may have restored the default SIGPIPE handling.
+            self.conn.sendall(line, socket.MSG_NOSIGNAL)
+        except OSError as ex:
+            raise ClientGone(f'client stopped reading: {ex}')
+
+
+class Daemon:
+    def __init__(self, litman):
+        self.litman = litman
+        self.sock_fn = socket_fn(litman.litman_dir)
+        self.watcher = None
+        self._server = None
+        self._running = False
+
+    def __repr__(self):
+        return f"Daemon('{self.sock_fn}')"
+
+    def serve(self):
+        if request(self.litman.litman_dir, {'op': 'ping'}) is not None:
+            raise Exception(f'a daemon is already listening on {self.sock_fn}')
+        if os.path.exists(self.sock_fn):
+            os.remove(self.sock_fn)
+
+        self.watcher = make_watcher(self.litman)
+        self.litman.rescan()
+        self.litman.write_completion_index()
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.litman.data_path(SOCKET_BASENAME))
+        self._server.listen()
+        # Let SIGTERM (e.g. from systemd or kill) clean up like Ctrl-C does.
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        logger.info(f'serving {len(self.litman.items)} items on {self.sock_fn}')
+
+        self._running = True
+        try:
+            while self._running:
+                fds = [self._server]
+                if self.watcher.fileno() is not None:
+                    fds.append(self.watcher)
+                readable, _, _ = select.select(fds, [], [])
+                if self.watcher in readable:
+                    self.watcher.read_events()
+                if self._server in readable:
+                    conn, _ = self._server.accept()
+                    with conn:
+                        self._handle(conn)
+        except KeyboardInterrupt:
+            logger.info('interrupted')
+        finally:
+            self._server.close()
+            os.remove(self.sock_fn)
+            self.watcher.close()
+            # Saves the caches, and closes the catalog and search index.
+            self.litman.close()
+
+    def refresh(self):
+        if not self.watcher.dirty:
+            return
+        names = self.watcher.take()
+        if names is None:
+            # Polling, or inotify lost events: work it out from the mtimes.
+            self.litman.rescan()
+        else:
+            self.litman.refresh_items(names)
+        self.litman.write_completion_index()
+
+    def _handle(self, conn):
+        conn.settimeout(CLIENT_TIMEOUT)
+        try:
+            with conn.makefile('rb') as f:
+                message = json.loads(f.readline())
+            op = message.get('op')
+            if op not in ['ping', 'stop', 'run', 'tags', 'list', 'get_item', 'search']:
+                raise ValueError(f'unknown op: {op}')
+            self.refresh()
+            reply = {'ok': True}
+            if op == 'run':
+                # The output goes to conn as it is printed.
+                self._run(message, conn)
+            else:
+                reply.update(getattr(self, f'_op_{op}')(message))
+        except (socket.timeout, ConnectionError) as ex:
+            logger.warning(f'dropping client: {ex}')
+            return
+        except Exception as ex:
+            logger.debug(f'request failed: {ex!r}')
+            reply = {'ok': False, 'error': str(ex), 'error_type': type(ex).__name__}
+        try:
+            conn.sendall(json.dumps(reply).encode() + b'\n')
+        except (socket.timeout, ConnectionError) as ex:
+            logger.warning(f'dropping client: {ex}')
+
+    def _op_ping(self, message):
+        return {}
+
+    def _op_stop(self, message):
+        self._running = False
+        return {}
+
+    def _run(self, message, conn):
+        # Imported here as litman_cmd imports this module.
+        from litman.litman_cmd import parse_args
+
+        try:
+            litman_cmds, args = parse_args(message['argv'])
+        except SystemExit:
+            raise ValueError(f'cannot parse arguments: {message["argv"]}')
+        cmd = litman_cmds[args.cmd_name]
+        if not daemon_ok(cmd, args):
+            raise ValueError(f'{args.cmd_name} cannot be run by the daemon')
+        output = _OutputWriter(conn)
+        try:
+            with redirect_stdout(output):
+                cmd.main(self.litman, args)
+            output.flush()
+        finally:
+            # Commands that print a lot (e.g. list_items) restore the default SIGPIPE
+            # handling for the CLI, which would let a vanished client kill the daemon.
+            signal.signal(signal.SIGPIPE, signal.SIG_IGN)
+
+    def _op_tags(self, message):
+        return {'tags': self.litman.get_tags()}
+
+    def _op_list(self, message):
+        items = self.litman.get_items(message.get('tag_filter'))
+        return {'items': sorted(item.name for item in items)}
+
+    def _op_get_item(self, message):
+        item = self.litman.get_item(message['name'], message.get('allow_partial', False))
+        return {'item': _item_dict(item)}
+
+    def _op_search(self, message):
+        matches = self.litman.search(message['pattern'], message.get('ignore_case', False),
+                                     words=message.get('words', False),
+                                     workers=message.get('workers'))
+        return {'matches': [[item.name, [list(span) for span in spans]]
+                            for item, spans in matches]}
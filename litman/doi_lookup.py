@@ -7,8 +7,6 @@ import re
 import difflib
 from logging import getLogger
 
-import requests
-
 logger = getLogger('litman.doi_lookup')
 
 CROSSREF_URL = 'https://api.crossref.org/works'
@@ -66,6 +64,8 @@ def fetch_bibtex(doi, mailto=None, timeout=25):
 
     Returns the raw BibTeX string, or '' on failure.
     """
+    import requests
+
     doi = normalize_doi(doi)
     url = f'{CROSSREF_URL}/{doi}/transform/application/x-bibtex'
     params = {'mailto': mailto} if mailto else {}
@@ -86,6 +86,8 @@ def crossref_lookup(title, year=None, mailto=None, rows=3, timeout=25):
     the normalized local and CrossRef titles (1.0 == identical). Returns
     ('', '', 0.0) if nothing is found.
     """
+    import requests
+
     query = title if not year else f'{title} {year}'
     params = {'query.bibliographic': query, 'rows': rows}
     if mailto:
@@ -4,15 +4,33 @@ export FLASK_APP=litman_web.py
 export FLASK_DEBUG=1
 flask run
 """
+import threading
+
 from flask import Flask, request
 from flask import render_template
 
-from litman import LitMan, load_config
+from litman import LitMan, load_config, litman_options
+from litman.litman import item_sort_key
 
 app = Flask(__name__)
 
 litmanrc_fn, config = load_config()
-litman = LitMan(config['litman_dir'])
+litman = LitMan(config['litman_dir'], **litman_options(config))
+# Requests are handled in threads, and LitMan is not thread safe: each request
+# holds this from its rescan until it has been answered.
+litman_lock = threading.Lock()
+
+
+@app.before_request
+def refresh_items():
+    litman_lock.acquire()
+    # Incremental after the first request: only changed item dirs are re-read.
+    litman.rescan()
+
+
+@app.teardown_request
+def release_litman(exc):
+    litman_lock.release()
 
 
 @app.route('/')
@@ -28,8 +46,7 @@ def list_items():
         sort_on = ['name']
 
     items = litman.get_items(tag_filter)
-    for sort in sort_on:
-        items = sorted(items, key=lambda item: getattr(item, sort))
+    items = sorted(items, key=lambda item: item_sort_key(item, sort_on))
 
     return render_template('items.html', items=items, curr_sorts='')
 
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 import sys
 import os
-import hashlib
 
 def chunk_reader(fobj, chunk_size=1024):
     """Generator that reads a file in chunks of bytes"""
@@ -11,7 +10,10 @@ def chunk_reader(fobj, chunk_size=1024):
             return
         yield chunk
 
-def check_for_duplicates(paths, hash=hashlib.sha1):
+def check_for_duplicates(paths, hash=None):
+    if hash is None:
+        import hashlib
+        hash = hashlib.sha1
     nondups = []
     dups = []
     hashes = {}
@@ -2,12 +2,12 @@
 import os
 import re
 import string
-
-import requests
 import json
 
 
 def gen_journal_abbr_name_map(output_dir):
+    import requests
+
     pages = {}
     for p in string.ascii_uppercase:
         pages[p] =  requests.get(f'https://images.webofknowledge.com/WOK48B5/help/WOS/{p}_abrvjt.html')
@@ -0,0 +1,123 @@
+"""Indexes over scanned items, for LitMan.get_items and get_item.
+
+Each item gets a position; every tag and has_* flag maps to an int whose set bits
+are the positions of the items that carry it. A filter is then a handful of
+bitwise ANDs, and only the matching items are looked at. Item names are also kept
+sorted, so partial names resolve with a binary search.
+
+A refreshed item takes over its old position, and a removed item's position is
+reused by the next one added, so a long-lived index does not grow with churn.
+"""
+from bisect import bisect_left, insort
+
+from litman.catalog import FLAGS
+
+
+def _bits(positions, n):
+    # Much faster than or-ing in one bit at a time, which copies the int each time.
+    buf = bytearray(n // 8 + 1)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, 'little')
+
+
+class ItemIndex:
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.positions = {item.name: pos for pos, item in enumerate(self.items)}
+        self.sorted_names = sorted(self.positions)
+        # Tags as of the last add/update, to know which bitmaps to clear.
+        self._item_tags = [list(item.tags) for item in self.items]
+        n = len(self.items)
+        self.live = (1 << n) - 1
+        # Positions of removed items, for add to reuse.
+        self._free = []
+
+        tag_positions = {}
+        for pos, item in enumerate(self.items):
+            for tag in item.tags:
+                tag_positions.setdefault(tag, []).append(pos)
+        self.tags = {tag: _bits(positions, n) for tag, positions in tag_positions.items()}
+        self.flags = {flag: _bits([pos for pos, item in enumerate(self.items)
+                                   if getattr(item, flag)], n)
+                      for flag in FLAGS}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, item):
+        if self._free:
+            pos = self._free.pop()
+            self.items[pos] = item
+        else:
+            pos = len(self.items)
+            self.items.append(item)
+            self._item_tags.append([])
+        self.positions[item.name] = pos
+        insort(self.sorted_names, item.name)
+        self.live |= 1 << pos
+        self._set(pos, item)
+
+    def remove(self, item):
+        pos = self.positions.pop(item.name)
+        del self.sorted_names[bisect_left(self.sorted_names, item.name)]
+        self._clear(pos)
+        self.live &= ~(1 << pos)
+        self.items[pos] = None
+        self._free.append(pos)
+
+    def update(self, item):
+        """Re-index an item whose tags or flags have changed, or put a reloaded item
+        in place of the one with its name; returns the previous tags."""
+        pos = self.positions[item.name]
+        old_tags = self._item_tags[pos]
+        self._clear(pos)
+        self.items[pos] = item
+        self._set(pos, item)
+        return old_tags
+
+    def _set(self, pos, item):
+        bit = 1 << pos
+        for tag in item.tags:
+            self.tags[tag] = self.tags.get(tag, 0) | bit
+        for flag in FLAGS:
+            if getattr(item, flag):
+                self.flags[flag] |= bit
+        self._item_tags[pos] = list(item.tags)
+
+    def _clear(self, pos):
+        mask = ~(1 << pos)
+        for tag in set(self._item_tags[pos]):
+            self.tags[tag] &= mask
+            if not self.tags[tag]:
+                del self.tags[tag]
+        for flag in FLAGS:
+            self.flags[flag] &= mask
+        self._item_tags[pos] = []
+
+    def tag_bits(self, tag):
+        return self.tags.get(tag, 0)
+
+    def flag_bits(self, flag, value):
+        bits = self.flags[flag]
+        return bits if value else self.live & ~bits
+
+    def prefix_matches(self, prefix):
+        """Names starting with prefix, in sorted order: O(log N) plus the number found."""
+        lo = bisect_left(self.sorted_names, prefix)
+        hi = bisect_left(self.sorted_names, prefix + '\U0010ffff', lo)
+        return self.sorted_names[lo:hi]
+
+    def live_items(self):
+        return self.select(self.live)
+
+    def select(self, bits):
+        """The items whose positions are set in bits, in position order."""
+        # bin() and str.find do the scanning in C; Python only touches the matches.
+        items = []
+        set_bits = bin(bits)[:1:-1]
+        pos = set_bits.find('1')
+        while pos != -1:
+            items.append(self.items[pos])
+            pos = set_bits.find('1', pos + 1)
+        return items
@@ -1,18 +1,19 @@
 import os
 import re
+import sys
+import heapq
 import itertools
 from logging import getLogger
-from subprocess import call, Popen, DEVNULL
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, deque
+from operator import itemgetter
 from signal import signal, SIGPIPE, SIG_DFL
-import webbrowser
-import markdown
 
 from configparser import ConfigParser
 
-from pybtex.database import parse_file as parse_bib_file
-from pybtex.database import BibliographyData
-
+from litman import (bib_cache, catalog, completion, corpus, payload_cache, search_index,
+                    tag_query, text_store, trigram)
+from litman.payload_cache import MISSING
+from litman.item_index import ItemIndex
 from litman.find_dups import check_for_duplicates
 from litman.html_template import html_tpl
 from litman.gen_journal_abbr_name import load_journal_abbr_name_map
@@ -69,6 +70,63 @@ def load_config():
         return None, None
 
 
+def litman_options(config):
+    """Keyword arguments for LitMan from the [litman] section of .litmanrc."""
+    options = {}
+    if config and 'catalog' in config:
+        options['use_catalog'] = config.getboolean('catalog')
+    if config and 'scan_workers' in config:
+        options['scan_workers'] = config.getint('scan_workers')
+    if config and 'search_workers' in config:
+        options['search_workers'] = config.getint('search_workers')
+    if config and 'bib_cache' in config:
+        options['use_bib_cache'] = config.getboolean('bib_cache')
+    if config and 'corpus' in config:
+        options['use_corpus'] = config.getboolean('corpus')
+    if config and 'text_compression' in config:
+        options['text_compression'] = config['text_compression']
+    if config and 'cache_mb' in config:
+        options['cache_mb'] = config.getfloat('cache_mb')
+    return options
+
+
+def _search_texts(pattern, flags, texts, first_only=False):
+    """[(name, [(start, end), ...])] for each (name, extracted_text_fn, corpus location)
+    in texts whose text matches; the text is read from the packed corpus if it has a
+    location there (see litman.corpus). Run in LitMan.iter_search's worker
+    processes: only the spans are sent back, not the text."""
+    m = re.compile(pattern, flags=flags)
+    mapped = {}
+    found = []
+    for name, text_fn, location in texts:
+        if location is None:
+            text = text_store.read_text(text_fn)
+        else:
+            corpus_fn, offset, length = location
+            if corpus_fn not in mapped:
+                mapped[corpus_fn] = corpus.map_corpus(corpus_fn)
+            text = corpus.read_text(mapped[corpus_fn], offset, length)
+        matches = m.finditer(text)
+        if first_only:
+            matches = itertools.islice(matches, 1)
+        spans = [match.span() for match in matches]
+        if spans:
+            found.append((name, spans))
+    return found
+
+
+def item_sort_key(item, sort_on):
+    """Sort key for item: a tuple of its values for each of sort_on (name, year, authors,
+    title or a has_* flag), in priority order. Computed once per item by sorted()."""
+    key = []
+    for sort in sort_on:
+        if sort in ['year', 'authors', 'title']:
+            key.append(getattr(item, sort)())
+        else:
+            key.append(getattr(item, sort))
+    return tuple(key)
+
+
 def _scan_dirs(start_dir, ext):
     fns = []
     for root, dirs, files in os.walk(start_dir):
@@ -79,16 +137,21 @@ def _scan_dirs(start_dir, ext):
     return fns
 
 
-def _extract_text(pdf_fn, output_fn):
-    pdf_basename = os.path.basename(pdf_fn)
-    text_basename = 'extracted_text.txt'
+def _extract_text(pdf_fn, output_fn, compression='none'):
+    """Extract pdf_fn's text to output_fn, stored with compression (see
+    litman.text_store); returns the filename it ends up in."""
+    from subprocess import call
+
     logger.debug(f'extract text: {pdf_fn} -> {output_fn}')
     call(['pdftotext', pdf_fn, output_fn])
+    if not os.path.exists(output_fn):
+        return output_fn
+    return text_store.store(output_fn, compression)
 
 
 def _pdf_metadata_title(pdf_fn):
     """The Title field from the PDF's metadata, or '' (often missing/junk)."""
-    from subprocess import check_output
+    from subprocess import check_output, DEVNULL
     try:
         out = check_output(['pdfinfo', pdf_fn], stderr=DEVNULL).decode('utf-8', 'replace')
     except Exception:
@@ -138,22 +201,165 @@ def _get_cites_from_tex(tex_fn):
     return cites, cites_dict
 
 def _read_tags(tags_fn):
+    # Interned: each tag is shared by many items.
     with open(tags_fn, 'r') as f:
-        tags = list(map(str.strip, f.read().split(',')))
+        tags = [sys.intern(tag.strip()) for tag in f.read().split(',')]
     return tags
 
 
-def _add_tag(tags_fn, tag):
-    if os.path.exists(tags_fn):
-        tags = _read_tags(tags_fn)
-        tags.append(tag)
-    else:
-        tags = [tag]
-
-    tags = sorted(list(set(tags)))
-    logger.debug(f'appending tags {tags}')
-    with open(tags_fn, 'w') as f:
+def _write_tags(tags_fn, tags):
+    """Replace tags_fn in one step, so readers never see a partly written file."""
+    if not tags:
+        if os.path.exists(tags_fn):
+            os.remove(tags_fn)
+        return
+    logger.debug(f'writing tags {tags}')
+    tmp_fn = os.path.join(os.path.dirname(tags_fn), '.tags.txt.tmp')
+    with open(tmp_fn, 'w') as f:
         f.write(','.join(tags) + '\n')
+    os.replace(tmp_fn, tags_fn)
+
+
+def _list_dir(path):
+    """{name: DirEntry} for path, from a single os.scandir call."""
+    with os.scandir(path) as it:
+        return {entry.name: entry for entry in it}
+
+
+def _entry_exists(entries, fn):
+    # Like os.path.exists: a dangling symlink (e.g. to a moved PDF) does not count.
+    # DirEntry.is_symlink() is answered from the listing, so only symlinks cost a stat.
+    entry = entries.get(fn)
+    if entry is None:
+        return False
+    return not entry.is_symlink() or os.path.exists(entry.path)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _mtimes_unchanged(item_dir, mtimes):
+    """Whether an item's recorded (dir, tags.txt, ref.bib, title.txt) mtimes are current."""
+    if _mtime(item_dir) != mtimes[0]:
+        return False
+    # An unchanged dir mtime means an unchanged set of files, so only the
+    # contents of those that existed need checking.
+    return all(_mtime(os.path.join(item_dir, fn)) == mtime
+               for fn, mtime in zip(catalog.MTIME_FNS.values(), mtimes[1:]) if mtime is not None)
+
+
+_BIB_HEAD_RE = re.compile(r'\s*@(\w+)\s*\{\s*([^\s,{}"#%]+)\s*,')
+_BIB_FIELD_NAME_RE = re.compile(r'\s*([A-Za-z][\w\-:.]*)\s*=\s*')
+_BIB_AND_RE = re.compile(r'\s+and\s+', re.IGNORECASE)
+_BIB_NUMBER_RE = re.compile(r'\d+')
+_BIB_MACRO_RE = re.compile(r'[A-Za-z][\w\-:.]*')
+# The macros pybtex (like BibTeX) predefines; CrossRef's BibTeX uses them for month.
+_BIB_MONTHS = {'jan': 'January', 'feb': 'February', 'mar': 'March', 'apr': 'April',
+               'may': 'May', 'jun': 'June', 'jul': 'July', 'aug': 'August',
+               'sep': 'September', 'oct': 'October', 'nov': 'November', 'dec': 'December'}
+_BIB_SEP_RE = re.compile(r'\s*(,?)')
+_BIB_TAIL_RE = re.compile(r'\s*\}\s*$')
+
+
+def _bib_value(text, pos):
+    """(value, end) for the braced, quoted, numeric or month macro value at text[pos:],
+    or None."""
+    if pos == len(text):
+        return None
+    if text[pos] in '{"':
+        depth = 0
+        for i in range(pos, len(text)):
+            c = text[i]
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+            if (text[pos] == '{' and depth == 0) or (c == '"' and i > pos and depth == 0):
+                return text[pos + 1:i], i + 1
+            if depth < 0:
+                return None
+        return None
+    m = _BIB_NUMBER_RE.match(text, pos)
+    if m:
+        return m.group(), m.end()
+    m = _BIB_MACRO_RE.match(text, pos)
+    if m and m.group().lower() in _BIB_MONTHS:
+        return _BIB_MONTHS[m.group().lower()], m.end()
+    # A @string macro name: only pybtex knows what it expands to.
+    return None
+
+
+def _bib_last_name(name):
+    """The first of a name's last names, as pybtex would split it, or None if unsure."""
+    if '{' in name or '\\' in name or '~' in name:
+        return None
+    parts = name.split(',')
+    if len(parts) > 3:
+        return None
+    words = parts[0].split()
+    if not words or not all(w[0].isalpha() for w in words):
+        return None
+    if len(words) == 1:
+        return words[0]
+    # "von Last" (with a comma) or "First von Last": the von part runs up to the
+    # last lowercase word before the final word; the last names follow it.
+    lower = [i for i, w in enumerate(words[:-1]) if w[0].islower()]
+    if len(parts) == 1 and not lower:
+        return words[-1]
+    return words[lower[-1] + 1] if lower else words[0]
+
+
+def _read_bib_fields(bib_fn):
+    """Hot metadata from a single-entry ref.bib without going through pybtex.
+
+    Returns (key, fields, author last names), with fields keyed by lowercased name
+    and whitespace collapsed as pybtex does, or None for anything out of the
+    ordinary (several entries, macros other than the months, # concatenation,
+    comments, LaTeX in author names, duplicate fields, truncated input...), which
+    the caller should hand to pybtex instead.
+    """
+    with open(bib_fn, 'r') as f:
+        text = f.read()
+    m = _BIB_HEAD_RE.match(text)
+    if not m or m.group(1).lower() in ['string', 'comment', 'preamble']:
+        return None
+    key = m.group(2)
+    pos = m.end()
+    fields = {}
+    while True:
+        m = _BIB_FIELD_NAME_RE.match(text, pos)
+        if not m:
+            break
+        name = m.group(1).lower()
+        value = _bib_value(text, m.end())
+        if value is None or name in fields:
+            # A duplicate field is an error in pybtex; leave it to raise that.
+            return None
+        fields[name], pos = ' '.join(value[0].split()), value[1]
+        m = _BIB_SEP_RE.match(text, pos)
+        pos = m.end()
+        if not m.group(1):
+            break
+    if not _BIB_TAIL_RE.match(text, pos):
+        return None
+
+    # Like pybtex, keep person fields out of fields.
+    fields.pop('editor', None)
+    author = fields.pop('author', None)
+    authors = []
+    if author:
+        for name in _BIB_AND_RE.split(author):
+            last_name = _bib_last_name(name)
+            if last_name is None:
+                return None
+            authors.append(last_name)
+    elif author is not None:
+        return None
+    return key, fields, authors
 
 
 def _remove_periods(path):
@@ -164,83 +370,213 @@ class ItemNotFound(Exception):
     pass
 
 
+# LitItem's has_* flags are bits of one int, in catalog.FLAGS order.
+_FLAG_BITS = {flag: 1 << i for i, flag in enumerate(catalog.FLAGS)}
+
+
+def _flag_property(flag):
+    bit = _FLAG_BITS[flag]
+
+    def get(self):
+        return bool(self._flags & bit)
+
+    def set(self, value):
+        self._flags = self._flags | bit if value else self._flags & ~bit
+
+    return property(get, set)
+
+
 class LitItem:
-    def __init__(self, litman, name):
+    # There can be very many items: no per-item __dict__, flags packed into one int,
+    # and file paths built when asked for rather than stored.
+    __slots__ = ['litman', 'name', 'tags', '_flags', '_text_basename', '_meta']
+
+    has_title_file = _flag_property('has_title_file')
+    has_summary = _flag_property('has_summary')
+    has_pdf = _flag_property('has_pdf')
+    has_bib = _flag_property('has_bib')
+    has_extracted_text = _flag_property('has_extracted_text')
+    has_tags = _flag_property('has_tags')
+    has_notes = _flag_property('has_notes')
+
+    def __init__(self, litman, name, catalog_row=None, entries=None):
         self.litman = litman
-        if not os.path.exists(os.path.join(self.litman.lit_dir, name)):
-            raise ItemNotFound(f'item {name} not found')
-
         self.name = name
-
-        self.pdf_fn = os.path.join(self.litman.lit_dir, name, f'{name}.pdf')
-        self.bib_fn = os.path.join(self.litman.lit_dir, name, 'ref.bib')
-        self.extracted_text_fn = os.path.join(self.litman.lit_dir, name, 'extracted_text.txt')
-        self.title_fn = os.path.join(self.litman.lit_dir, name, 'title.txt')
-        self.tags_fn = os.path.join(self.litman.lit_dir, name, 'tags.txt')
-        self.notes_fn = os.path.join(self.litman.lit_dir, name, 'notes.md')
-        self.notes_html_fn = os.path.join(self.litman.lit_dir, name, 'notes.html')
-        self.summary_fn = os.path.join(self.litman.lit_dir, name, 'summary.json')
-
-        self.has_title_file = os.path.exists(self.title_fn)
-        self.has_summary = os.path.exists(self.summary_fn)
-        self.has_pdf = os.path.exists(self.pdf_fn)
-        self.has_bib = os.path.exists(self.bib_fn)
-        self.has_extracted_text = os.path.exists(self.extracted_text_fn)
-        self.has_tags = os.path.exists(self.tags_fn)
-        self.has_notes = os.path.exists(self.notes_fn)
-
-        if self.has_tags:
-            self.tags = _read_tags(self.tags_fn)
+        self._flags = 0
+        # Found when it is first needed, as it may be compressed (see litman.text_store).
+        self._text_basename = None
+
+        if catalog_row is not None:
+            # Trust the catalog: the caller has checked its mtimes are current.
+            for flag in catalog.FLAGS:
+                if catalog_row[flag]:
+                    self._flags |= _FLAG_BITS[flag]
+            self.tags = catalog.row_tags(catalog_row)
+            self._meta = catalog.row_meta(catalog_row)
         else:
-            self.tags = []
+            # All has_* flags come from one listing of the item dir (entries, if the
+            # caller already has it) rather than an exists() call per file.
+            if entries is None:
+                try:
+                    entries = _list_dir(os.path.join(self.litman.lit_dir, name))
+                except (FileNotFoundError, NotADirectoryError):
+                    raise ItemNotFound(f'item {name} not found')
+            self.has_title_file = _entry_exists(entries, 'title.txt')
+            self.has_summary = _entry_exists(entries, 'summary.json')
+            self.has_pdf = _entry_exists(entries, f'{name}.pdf')
+            self.has_bib = _entry_exists(entries, 'ref.bib')
+            for basename in text_store.TEXT_BASENAMES:
+                if _entry_exists(entries, basename):
+                    self.has_extracted_text = True
+                    self._text_basename = basename
+                    break
+            self.has_tags = _entry_exists(entries, 'tags.txt')
+            self.has_notes = _entry_exists(entries, 'notes.md')
+
+            if self.has_tags:
+                self.tags = _read_tags(self.tags_fn)
+            else:
+                self.tags = []
+            self._meta = None
 
-        self._bib_loaded = False
-        self._extracted_text_loaded = False
-        self._notes_loaded = False
+        # Text, notes and ref.bib are kept in the LitMan's payload cache, not here.
 
     def __repr__(self):
         return f"LitItem({self.litman.__repr__()}, '{self.name}')"
 
+    def _path(self, basename):
+        return os.path.join(self.litman.lit_dir, self.name, basename)
+
+    @property
+    def pdf_fn(self):
+        return self._path(f'{self.name}.pdf')
+
+    @property
+    def bib_fn(self):
+        return self._path('ref.bib')
+
+    @property
+    def title_fn(self):
+        return self._path('title.txt')
+
+    @property
+    def tags_fn(self):
+        return self._path('tags.txt')
+
+    @property
+    def notes_fn(self):
+        return self._path('notes.md')
+
+    @property
+    def notes_html_fn(self):
+        return self._path('notes.html')
+
+    @property
+    def summary_fn(self):
+        return self._path('summary.json')
+
+    @property
+    def extracted_text_fn(self):
+        if self._text_basename is None:
+            self._text_basename = os.path.basename(
+                text_store.find_text_fn(os.path.join(self.litman.lit_dir, self.name)))
+        return self._path(self._text_basename)
+
     def _load_bib(self):
-        if self.has_bib:
+        if self.has_bib and self.litman.use_bib_cache:
+            # The Entry itself is only built from the record if bib_entry() is called.
+            bib_name, bib_record = self.litman.bib_cache().load(self.bib_fn)
+            return bib_name, None, bib_record
+        elif self.has_bib:
+            from pybtex.database import parse_file as parse_bib_file
+
             bib_data = parse_bib_file(self.bib_fn)
             assert len(bib_data.entries.keys()) == 1
-            self._bib_name = list(bib_data.entries.keys())[0]
-            self._bib_entry = list(bib_data.entries.values())[0]
+            return list(bib_data.entries.keys())[0], list(bib_data.entries.values())[0], None
         else:
-            self._bib_name = None
-            self._bib_entry = None
-        self._bib_loaded = True
+            return None, None, None
+
+    def _bib(self):
+        # (bib name, Entry or None, bib cache record or None)
+        bib = self.litman.payloads.get(self, 'bib')
+        if bib is MISSING:
+            bib = self.litman.payloads.put(self, 'bib', self._load_bib())
+        return bib
 
     def bib_name(self):
-        if not self._bib_loaded:
-            self._load_bib()
-        return self._bib_name
+        return self._bib()[0]
 
     def bib_entry(self):
-        if not self._bib_loaded:
-            self._load_bib()
-        return self._bib_entry
+        bib_name, bib_entry, bib_record = self._bib()
+        if bib_entry is None and bib_record is not None:
+            bib_entry = bib_cache.record_to_entry(bib_record)
+            self.litman.payloads.put(self, 'bib', (bib_name, bib_entry, bib_record))
+        return bib_entry
+
+    def _bib_changed(self):
+        self.litman.payloads.discard(self, 'bib')
+        self.litman.payloads.discard(self, 'bib_fields')
+        self._meta = None
+
+    def _read_bib_fast(self):
+        # (key, fields, authors) from the native reader; None while ref.bib is
+        # loaded properly, or if it needs pybtex.
+        if self.litman.payloads.get(self, 'bib') is not MISSING:
+            return None
+        fast = self.litman.payloads.get(self, 'bib_fields')
+        if fast is MISSING:
+            fast = self.litman.payloads.put(self, 'bib_fields',
+                                            _read_bib_fields(self.bib_fn) or False)
+        return fast or None
+
+    def _bib_fields(self):
+        # Cheapest source first: the native reader, then the bib cache (which avoids
+        # building an Entry), then pybtex.
+        fast = self._read_bib_fast()
+        if fast:
+            return fast[1]
+        bib_record = self._bib()[2]
+        if bib_record is not None:
+            return bib_cache.record_fields(bib_record)
+        return self.bib_entry().fields
 
     def extracted_text(self):
-        if not self._extracted_text_loaded:
-            self._load_extracted_text()
-        return self._extracted_text
-
-    def _load_extracted_text(self):
-        if self.has_extracted_text:
-            with open(self.extracted_text_fn, 'r') as f:
-                self._extracted_text = f.read()
-        else:
-            self._extracted_text = None
-        self._extracted_text_loaded = True
+        if not self.has_extracted_text:
+            return None
+        text = self.litman.payloads.get(self, 'text')
+        if text is MISSING:
+            text = self.litman.payloads.put(self, 'text', self._read_extracted_text())
+        return text
+
+    def read_extracted_text(self):
+        """The extracted text, without caching it as extracted_text() does."""
+        if not self.has_extracted_text:
+            return None
+        text = self.litman.payloads.get(self, 'text')
+        if text is MISSING:
+            text = self._read_extracted_text()
+        return text
+
+    def _read_extracted_text(self):
+        if self.litman.use_corpus:
+            text = self.litman.corpus().text(self)
+            if text is not None:
+                return text
+        return text_store.read_text(self.extracted_text_fn)
 
     def notes(self):
-        if not self._notes_loaded:
-            self._load_notes()
-        return self._notes
+        if not self.has_notes:
+            return None
+        notes = self.litman.payloads.get(self, 'notes')
+        if notes is MISSING:
+            with open(self.notes_fn, 'r') as f:
+                notes = self.litman.payloads.put(self, 'notes', f.read())
+        return notes
 
     def open_notes(self):
+        import webbrowser
+        import markdown
+
         notes = self.notes()
         if notes:
             with open(self.notes_html_fn, 'w') as f:
@@ -249,17 +585,12 @@ class LitItem:
         else:
             print(f'DOI for {self.name} not known')
 
-    def _load_notes(self):
-        if self.has_notes:
-            with open(self.notes_fn, 'r') as f:
-                self._notes = f.read()
-        else:
-            self._notes = None
-        self._notes_loaded = True
-
     def doi_url(self):
+        if self._meta is not None:
+            doi = self._meta['doi']
+            return 'https://doi.org/' + doi.replace('\\', '') if doi else ''
         if self.has_bib:
-            fields = self.bib_entry().fields
+            fields = self._bib_fields()
             if 'doi' in fields:
                 doi = fields['doi']
                 doi = doi.replace('\\', '')
@@ -267,6 +598,8 @@ class LitItem:
         return ''
 
     def open_doi(self):
+        import webbrowser
+
         doi_url = self.doi_url()
         if doi_url:
             webbrowser.open(doi_url)
@@ -274,8 +607,10 @@ class LitItem:
             print(f'DOI for {self.name} not known')
 
     def title(self):
+        if self._meta is not None:
+            return self._meta['title']
         if self.has_bib:
-            return self.bib_entry().fields['title']
+            return self._bib_fields()['title']
         elif os.path.exists(self.title_fn):
             with open(self.title_fn, 'r') as f:
                 return f.read().strip()
@@ -283,10 +618,12 @@ class LitItem:
             return ''
 
     def year(self):
+        if self._meta is not None:
+            return self._meta['year']
         years = []
 
         if self.has_bib:
-            bib_year = int(self.bib_entry().fields['year'])
+            bib_year = int(self._bib_fields()['year'])
             years.append(bib_year)
         name_year = re.match('\D*(?P<year>\d*)\D*', self.name).group('year')
         if len(name_year) != 4:
@@ -304,22 +641,59 @@ class LitItem:
             return -999
 
     def _get_bib_authors(self):
-        authors = self.bib_entry().persons['author']
+        fast = self._read_bib_fast()
+        if fast:
+            return fast[2]
+        bib_record = self._bib()[2]
+        if bib_record is not None:
+            return [last_names[0] for last_names in bib_cache.record_last_names(bib_record)]
+        authors = self.bib_entry().persons.get('author', [])
         # returns last names of authors.
         return [a.last()[0] for a in authors]
 
     def get_authors(self):
+        if self._meta is not None:
+            return self._meta['authors']
         if self.has_bib:
             return self._get_bib_authors()
         else:
             return ''
 
+    def journal(self):
+        if self._meta is not None:
+            return self._meta['journal']
+        if self.has_bib:
+            return self._bib_fields().get('journal', '')
+        return ''
+
+    def meta(self):
+        """The bib-derived values shown by `list` and `stats`, as stored in the catalog."""
+        doi = self._bib_fields().get('doi', '') if self.has_bib else ''
+        return {'year': self.year(), 'authors': self.get_authors(), 'title': self.title(),
+                'doi': doi, 'journal': self.journal()}
+
     def authors(self):
         return ', '.join(self.get_authors())
 
     def add_tag(self, tag):
-        _add_tag(self.tags_fn, tag)
-        self.tags = _read_tags(self.tags_fn)
+        self.update_tags(add=[tag])
+
+    def update_tags(self, add=(), remove=(), rename=None):
+        """Apply all the tag changes at once, writing tags.txt at most once.
+
+        remove and rename apply to the current tags, then add's tags are added.
+        Returns True if the tags changed.
+        """
+        rename = rename or {}
+        tags = {sys.intern(rename.get(tag, tag)) for tag in self.tags if tag and tag not in remove}
+        tags = sorted(tags | {sys.intern(tag) for tag in add if tag})
+        if tags == self.tags:
+            return False
+        _write_tags(self.tags_fn, tags)
+        self.tags = tags
+        self.has_tags = bool(tags)
+        self.litman._item_changed(self)
+        return True
 
     def set_title(self, title):
         if os.path.exists(self.title_fn):
@@ -329,20 +703,30 @@ class LitItem:
         logger.info(f'Setting title: {title}')
         with open(self.title_fn, 'w') as f:
             f.write(title)
+        self._meta = None
+        self.has_title_file = True
+        self.litman._item_changed(self)
 
     def add_pdf(self, pdf_fn):
-        _extract_text(pdf_fn, self.extracted_text_fn)
-        self.has_extracted_text = os.path.exists(self.extracted_text_fn)
-        self._extracted_text_loaded = False
+        text_fn = _extract_text(pdf_fn, self._path(text_store.TEXT_BASENAME),
+                                self.litman.text_compression)
+        self._text_basename = os.path.basename(text_fn)
+        self.has_extracted_text = os.path.exists(text_fn)
+        self.litman.payloads.discard(self, 'text')
 
-        pdf_symlink = self.pdf_fn
         if not os.path.exists(self.pdf_fn):
             os.symlink(pdf_fn, self.pdf_fn)
+        self.has_pdf = True
+        self.litman._item_changed(self)
 
     def add_bib_data(self, bib_name, bib_entry):
+        from pybtex.database import BibliographyData
+
         single_bib_data = BibliographyData({bib_name: bib_entry})
         single_bib_data.to_file(self.bib_fn)
-        self._bib_loaded = False
+        self._bib_changed()
+        self.has_bib = True
+        self.litman._item_changed(self)
 
     def add_bib_text(self, raw_bibtex, citekey=None):
         """Write a raw BibTeX entry to ref.bib, optionally re-keying the citation key.
@@ -356,8 +740,9 @@ class LitItem:
                           lambda m: f'{m.group(1)}{citekey},', text, count=1)
         with open(self.bib_fn, 'w') as f:
             f.write(text + '\n')
-        self._bib_loaded = False
+        self._bib_changed()
         self.has_bib = True
+        self.litman._item_changed(self)
 
     def set_field(self, field, value):
         if not self.has_bib:
@@ -386,13 +771,14 @@ class LitItem:
                           lambda m: f'{m.group(1)}\n    doi = "{doi}",', text, count=1)
         with open(self.bib_fn, 'w') as f:
             f.write(text)
-        self._bib_loaded = False
+        self._bib_changed()
 
     def write_summary(self, summary):
         import json
         with open(self.summary_fn, 'w') as f:
             json.dump(summary, f, indent=2)
         self.has_summary = True
+        self.litman._item_changed(self)
 
     def read_summary(self):
         import json
@@ -402,33 +788,52 @@ class LitItem:
             return json.load(f)
 
     def display(self):
+        from subprocess import Popen
+
         if self.has_pdf:
             Popen(['evince', self.pdf_fn])
         else:
             logger.info(f'item {self.name} has no PDF')
 
     def rename_tag(self, tag_old, tag_new):
-        if tag_old in self.tags:
-            os.remove(self.tags_fn)
-            for tag in self.tags:
-                if tag == tag_old:
-                    self.add_tag(tag_new)
-                else:
-                    self.add_tag(tag)
+        self.update_tags(rename={tag_old: tag_new})
 
 
 
 class LitMan:
-    def __init__(self, litman_dir):
+    def __init__(self, litman_dir, use_catalog=False, scan_workers=1, use_bib_cache=False,
+                 search_workers=1, use_corpus=False, text_compression='none',
+                 cache_mb=payload_cache.DEFAULT_CACHE_MB):
         self.litman_dir = litman_dir
         self.lit_dir = os.path.join(litman_dir, 'literature')
         # Generated/aggregate files (word index, journal map, theme report).
         self.data_dir = os.path.join(litman_dir, 'data')
         # Per-project symlink collections.
         self.projects_dir = os.path.join(litman_dir, 'projects')
-        self.items = []
+        # The items read so far by a scan in progress; see _scan_items.
+        self._scan_list = None
         self._tags = Counter()
+        self._index = None
         self._scanned = False
+        # The scan generator while iter_items is partway through one; see _iter_scan.
+        self._scan_gen = None
+        self.use_catalog = use_catalog
+        self.use_bib_cache = use_bib_cache
+        self._bib_cache = None
+        # {item name: mtimes} as of the last rescan; see rescan().
+        self._snapshot = None
+        # Threads used to read item dirs in _scan; >1 helps on NFS/SMB/sshfs.
+        self.scan_workers = scan_workers
+        # Processes used to run a regex over extracted texts in search.
+        self.search_workers = search_workers
+        self._catalog = None
+        self._search_index = None
+        self.use_corpus = use_corpus
+        self._corpus = None
+        # How new extracted text is stored; see litman.text_store.
+        self.text_compression = text_store.check_compression(text_compression)
+        # Items' text, notes and parsed ref.bib, least recently used dropped first.
+        self.payloads = payload_cache.PayloadCache(int(cache_mb * 1024 * 1024))
 
     def data_path(self, *parts):
         os.makedirs(self.data_dir, exist_ok=True)
@@ -437,6 +842,81 @@ class LitMan:
     def __repr__(self):
         return f"LitMan('{self.lit_dir}')"
 
+    def catalog(self):
+        if self._catalog is None:
+            self._catalog = catalog.Catalog(self.data_path(catalog.CATALOG_BASENAME))
+        return self._catalog
+
+    def bib_cache(self):
+        if self._bib_cache is None:
+            self._bib_cache = bib_cache.BibCache(self.data_path(bib_cache.BIB_CACHE_BASENAME))
+        return self._bib_cache
+
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = search_index.SearchIndex(
+                self.data_path(search_index.SEARCH_INDEX_BASENAME))
+        return self._search_index
+
+    def corpus(self):
+        if self._corpus is None:
+            os.makedirs(self.data_dir, exist_ok=True)
+            self._corpus = corpus.Corpus(self.data_dir)
+        return self._corpus
+
+    def update_corpus(self):
+        """Bring the packed corpus up to date with every item's extracted text."""
+        self._scan()
+        items = [item for item in self.items if item.has_extracted_text]
+        return self.corpus().update(items)
+
+    def compact_text(self, compression=None, tag_filter=None):
+        """Store items' extracted text with compression (by default the library's
+        text_compression). Returns (items converted, bytes before, bytes after)."""
+        compression = text_store.check_compression(compression or self.text_compression)
+        n_converted = size_before = size_after = 0
+        for item in self.get_items(tag_filter, has_extracted_text=True):
+            text_fn = item.extracted_text_fn
+            size_before += os.path.getsize(text_fn)
+            new_fn = text_store.store(text_fn, compression)
+            size_after += os.path.getsize(new_fn)
+            if new_fn != text_fn:
+                item._text_basename = os.path.basename(new_fn)
+                n_converted += 1
+        return n_converted, size_before, size_after
+
+    def update_search_index(self):
+        """Bring the search index up to date with every item's extracted text."""
+        self._scan()
+        items = [item for item in self.items if item.has_extracted_text]
+        return self.search_index().update(items)
+
+    def write_completion_index(self):
+        """Save the item names and tags for shell completion (see litman.completion)."""
+        if self._scanned:
+            completion.write_index(self.data_path(completion.INDEX_BASENAME),
+                                   self._index.sorted_names, self._tags)
+
+    def close(self):
+        """Write out caches and close the catalog."""
+        if self._scan_gen is not None:
+            # An unfinished scan (see iter_items) is dropped.
+            self._scan_gen.close()
+        self.write_completion_index()
+        if self._bib_cache is not None:
+            # Only a complete scan knows which ref.bibs have gone.
+            self._bib_cache.save([item.bib_fn for item in self.items if item.has_bib]
+                                 if self._scanned else None)
+        if self._catalog is not None:
+            self._catalog.close()
+            self._catalog = None
+        if self._search_index is not None:
+            self._search_index.close()
+            self._search_index = None
+        if self._corpus is not None:
+            self._corpus.close()
+            self._corpus = None
+
 
     def fetch_bib_for_item(self, item, mailto=None, min_ratio=0.9):
         """Try to populate an item's ref.bib from CrossRef. Returns the DOI used, or ''.
@@ -491,10 +971,8 @@ class LitMan:
                     logger.info(f'Creating item {item_name}')
                     item = self.create_item(item_name)
 
-                tags = os.path.split(os.path.relpath(pdf_fn, import_dir))[0].split(os.sep) + tags
-                for tag in tags:
-                    if tag:
-                        item.add_tag(tag)
+                dir_tags = os.path.split(os.path.relpath(pdf_fn, import_dir))[0].split(os.sep)
+                item.update_tags(add=dir_tags + tags)
 
                 if not item.has_pdf:
                     item.add_pdf(pdf_fn)
@@ -514,6 +992,8 @@ class LitMan:
                         os.symlink(rel_target, symlink)
 
     def import_bib(self, import_dir, tag=None):
+        from pybtex.database import parse_file as parse_bib_file
+
         import_dir = os.path.join(os.getcwd(), import_dir)
         import_dir = _remove_periods(import_dir)
         bib_fns = _scan_dirs(import_dir, ext='.bib')
@@ -546,7 +1026,7 @@ class LitMan:
         os.makedirs(os.path.join(self.lit_dir, name))
 
         item = LitItem(self, name)
-        self.items.append(item)
+        self._add_item(item)
         return item
 
     def get_item(self, item_name, allow_partial=False):
@@ -558,12 +1038,13 @@ class LitMan:
             except ItemNotFound:
                 if allow_partial:
                     self._scan()
-                    potential_items = [item for item in self.items
-                                       if item_name == item.name[:len(item_name)]]
-                    if len(potential_items) == 1:
-                        item = potential_items[0]
-                    elif len(potential_items) > 1:
-                        item_str = ", ".join([item.name for item in potential_items])
+                    names = self._index.prefix_matches(item_name)
+                    if len(names) == 1:
+                        item = self._item_cache[names[0]]
+                    elif len(names) > 1:
+                        item_str = ", ".join(names[:20])
+                        if len(names) > 20:
+                            item_str += f', ... ({len(names)} in all)'
                         msg = f'Multiple items matching {item_name} found: {item_str}'
                         raise ItemNotFound(msg)
                     else:
@@ -575,18 +1056,72 @@ class LitMan:
     def get_items(self, tag_filter=None, has_title_file=None,
                   has_pdf=None, has_bib=None, has_extracted_text=None):
         self._scan()
-        items = [item for item in self.items]
+        has_filters = {'has_title_file': has_title_file, 'has_pdf': has_pdf, 'has_bib': has_bib,
+                       'has_extracted_text': has_extracted_text}
+        if not tag_filter and all(value is None for value in has_filters.values()):
+            return self._index.live_items()
+
+        if tag_filter:
+            query = tag_query.parse_filter(tag_filter, self._tags.__contains__)
+            bits = tag_query.evaluate(query, self._index.tag_bits, self._index.live)
+        else:
+            bits = self._index.live
+        for flag, value in has_filters.items():
+            if value is not None:
+                bits &= self._index.flag_bits(flag, value)
+        return self._index.select(bits)
+
+    def iter_items(self, tag_filter=None, has_title_file=None,
+                   has_pdf=None, has_bib=None, has_extracted_text=None):
+        """Generate the items get_items would return, in the same order.
+
+        If lit_dir has not been scanned yet, items are generated as the scan reads
+        them, so the caller can start on the first while the rest are still being
+        read. Anything that needs the whole library in the meantime (get_items,
+        get_tags, ...) finishes the scan first. Closing the generator before the
+        end leaves the rest of the scan to whichever caller needs it next.
+
+        A tag_filter other than a plain tag name could be the name of a tag with
+        spaces (see tag_query.parse_filter), which is only known once every item
+        has been read, so it does not stream.
+        """
+        has_filters = {'has_title_file': has_title_file, 'has_pdf': has_pdf, 'has_bib': has_bib,
+                       'has_extracted_text': has_extracted_text}
+        has_filters = {flag: value for flag, value in has_filters.items() if value is not None}
+        query = None
         if tag_filter:
-            items = [item for item in items if tag_filter in item.tags]
-        if has_title_file is not None:
-            items = [item for item in items if item.has_title_file == has_title_file]
-        if has_pdf is not None:
-            items = [item for item in items if item.has_pdf == has_pdf]
-        if has_bib is not None:
-            items = [item for item in items if item.has_bib == has_bib]
-        if has_extracted_text is not None:
-            items = [item for item in items if item.has_extracted_text == has_extracted_text ]
-        return items
+            if tag_query.is_plain_tag(tag_filter):
+                query = tag_query.parse(tag_filter)
+            else:
+                self._scan()
+
+        scan = self._iter_scan()
+        if next(scan, None) is None:
+            # Already scanned (or the library is empty): the index has everything.
+            yield from self.get_items(tag_filter, **has_filters)
+            return
+
+        # By position in the scan's list rather than from scan: a nested _scan may
+        # have read the rest.
+        items = self._scan_list
+        pos = 0
+        while True:
+            while pos < len(items):
+                item = items[pos]
+                pos += 1
+                if query is not None and not tag_query.matches(query, item.tags):
+                    continue
+                if all(getattr(item, flag) == value for flag, value in has_filters.items()):
+                    yield item
+            if next(scan, None) is None:
+                break
+
+    @property
+    def items(self):
+        """Every item, in index order (while a scan is in progress, those read so far)."""
+        if self._index is None:
+            return list(self._scan_list or ())
+        return self._index.live_items()
 
     def get_tags(self):
         self._scan()
@@ -595,15 +1130,8 @@ class LitMan:
     def list_items(self, tag_filter=None, sort_on=['name'], reverse=False, **kwargs):
         self._scan()
         items = self.get_items(tag_filter, **kwargs)
-
-        for sort in sort_on:
-            if sort == 'year':
-                items = sorted(items, key=lambda item: item.year())
-            else:
-                items = sorted(items, key=lambda item: getattr(item, sort))
-
-        if reverse:
-            items = items[::-1]
+        # One sort on the full key, so the first of sort_on takes priority.
+        items = sorted(items, key=lambda item: item_sort_key(item, sort_on), reverse=reverse)
 
         # Handle a broken pipe:
         signal(SIGPIPE, SIG_DFL)
@@ -615,32 +1143,228 @@ class LitMan:
         def bstr(b):
             return 'T' if b else 'F'
 
+        # Rows are formatted (and any bib metadata read) one at a time as they are
+        # written, so `litman list | head` does not wait for the whole library.
         for item in items:
-            if not tag_filter or tag_filter in item.tags:
-                print(fmt.format(item.name, item.authors()[:20], item.year(),
-                                 bstr(item.has_pdf), bstr(item.has_bib),
-                                 item.title()[:50], item.tags))
+            print(fmt.format(item.name, item.authors()[:20], item.year(),
+                             bstr(item.has_pdf), bstr(item.has_bib),
+                             item.title()[:50], item.tags))
 
-    def rescan(self):
-        self._scanned = False
-        self.items = []
-        self._scan()
+    def rescan(self, dirty=()):
+        """Bring items up to date with lit_dir.
 
-    def search(self, text, ignore_case=False):
+        The first call rescans from scratch, recording the mtimes of each item dir
+        (and of its tags.txt, ref.bib and title.txt). Later calls only rebuild the
+        items whose mtimes have changed, and only relist lit_dir if its own mtime has.
+        Items named in dirty (e.g. by a file watcher) are rebuilt regardless.
+        """
+        if not self._scanned or self._snapshot is None:
+            self._scanned = False
+            self._snapshot = {}
+            self._scan()
+            return
+
+        lit_dir_mtime = _mtime(self.lit_dir)
+        if lit_dir_mtime != self._lit_dir_mtime:
+            names = self._list_item_names()
+            self._lit_dir_mtime = lit_dir_mtime
+        else:
+            names = list(self._item_cache)
+
+        removed = set(self._item_cache) - set(names)
+        unchanged = self._map(lambda name: name in self._snapshot and name not in dirty
+                              and _mtimes_unchanged(os.path.join(self.lit_dir, name),
+                                                    self._snapshot[name]), names)
+        self._reload_items([name for name, is_unchanged in zip(names, unchanged)
+                            if not is_unchanged], removed)
+
+    def refresh_items(self, names):
+        """Re-read just the named items, adding or dropping them as their dirs have
+        appeared or gone; for a file watcher that knows which items have changed.
+        Nothing else in lit_dir is looked at.
+        """
+        if not self._scanned or self._snapshot is None:
+            self.rescan()
+            return
+        self._reload_items([name for name in names if name[0] != '.'], set())
+
+    def _reload_items(self, names, removed):
+        changed = []
+        for name in names:
+            try:
+                item, mtimes = self._load_item(name)
+            except ItemNotFound:
+                removed.add(name)
+                continue
+            logger.debug(f'  refreshing item_dir {name}')
+            if name in self._item_cache:
+                self._replace_item(item)
+            else:
+                self._add_item(item)
+            self._snapshot[name] = mtimes
+            changed.append((item, mtimes))
+
+        removed = [name for name in removed if name in self._item_cache]
+        for name in removed:
+            logger.debug(f'  dropping item_dir {name}')
+            self._remove_item(self._item_cache[name])
+            self._snapshot.pop(name, None)
+
+        if self.use_catalog and (changed or removed):
+            self.catalog().update(changed, removed=removed)
+
+    def search(self, text, ignore_case=False, words=False, workers=None):
+        """[(item, [(start, end), ...])] for the items whose extracted text matches.
+
+        Collects the matches from iter_search, which has the details.
+        """
+        return [(item, [span for _, span in matches]) for item, matches
+                in itertools.groupby(self.iter_search(text, ignore_case, words, workers),
+                                     key=itemgetter(0))]
+
+    def iter_search(self, text, ignore_case=False, words=False, workers=None, first_only=False):
+        """Generate (item, (start, end)) for each match in items' extracted text, in
+        item order, as it is found; with first_only, just the first in each item.
+
+        text is a regex, or with words=True a word or phrase, which is looked up in
+        the search index (see litman.search_index) and always ignores case. Items
+        that are missing from the index or have changed since it was built are
+        scanned instead. For a regex, if there is a search index, only the items
+        that have the trigrams the regex needs (see litman.trigram) are scanned.
+        With more than one worker (workers, or by default search_workers), the
+        scanning is shared out over that many processes, but no more than there
+        are CPUs: matching is CPU bound, so more processes only add overhead.
+
+        Texts are not kept on the items, and no more is scanned than is asked for:
+        stop iterating (or close the generator) once there are enough matches.
+        """
         self._scan()
+        items = [item for item in self.items if item.has_extracted_text]
+        # [(position in items, item, span)] for the matches found in the search index.
+        indexed = []
+        if words:
+            terms = [term for term, _, _ in search_index.tokenize(text)]
+            if not terms:
+                return
+            fresh, to_scan = self.search_index().split_fresh(items)
+            positions = {item.name: i for i, item in enumerate(items)}
+            for doc_id, spans in self.search_index().phrase_spans(terms).items():
+                if doc_id in fresh:
+                    item = fresh[doc_id]
+                    indexed.extend((positions[item.name], item, span)
+                                   for span in (spans[:1] if first_only else spans))
+            indexed.sort(key=itemgetter(0))
+            if to_scan:
+                logger.info(f'{len(to_scan)} items not in the search index; '
+                            f'run `litman word-index` to update it')
+            text = search_index.phrase_regex(terms)
+            ignore_case = True
+        else:
+            to_scan = items
+
         flags = re.MULTILINE | re.DOTALL
         if ignore_case:
             flags |= re.IGNORECASE
-        all_matches = []
         m = re.compile(text, flags=flags)
-        for item in [item for item in self.items if item.has_extracted_text]:
-            matches = list(re.finditer(m, item.extracted_text()))
-            if matches:
-                all_matches.append((item, matches))
-                logger.debug(f'found matches for {item.name}')
-                for match in matches:
-                    logger.debug(f'matches: {matches}')
-        return all_matches
+        if not words and os.path.exists(os.path.join(self.data_dir,
+                                                     search_index.SEARCH_INDEX_BASENAME)):
+            to_scan = self._trigram_candidates(items, text, flags)
+        if workers is None:
+            workers = self.search_workers
+        workers = min(workers, os.cpu_count() or 1)
+        if workers > 1 and len(to_scan) > 1:
+            scanned = self._iter_search_parallel(text, flags, to_scan, workers, first_only)
+        else:
+            scanned = self._iter_search_serial(m, to_scan, first_only)
+
+        try:
+            if indexed:
+                # Both are in item order, and no item is in both.
+                positioned = ((positions[item.name], item, span) for item, span in scanned)
+                for _, item, span in heapq.merge(indexed, positioned, key=itemgetter(0)):
+                    yield item, span
+            else:
+                yield from scanned
+        finally:
+            # Stops any worker processes straight away if the caller stopped early.
+            scanned.close()
+
+    def rank_search(self, text, top_k=10):
+        """[(item, score, (start, end) or None)] for the top_k items by BM25 score for
+        the words in text, best first, with the span of each one's best snippet.
+
+        Answered from the search index alone (see SearchIndex.rank), without a
+        scan. The snippet is None for items whose text has changed since the
+        index was built, as its offsets may be out of date.
+        """
+        terms = [term for term, _, _ in search_index.tokenize(text)]
+        if not terms:
+            return []
+        ranked = []
+        n_stale = 0
+        for name, score, span in self.search_index().rank(terms, top_k):
+            try:
+                item = self.get_item(name)
+            except ItemNotFound:
+                logger.debug(f'ranked item {name} no longer exists')
+                continue
+            if not self.search_index().is_current(item):
+                n_stale += 1
+                span = None
+            ranked.append((item, score, span))
+        if n_stale:
+            logger.info(f'{n_stale} ranked items have changed since the search index was built; '
+                        f'run `litman word-index` to update it')
+        return ranked
+
+    def _iter_search_serial(self, m, items, first_only):
+        for item in items:
+            for match in m.finditer(item.read_extracted_text()):
+                yield item, match.span()
+                if first_only:
+                    break
+
+    def _iter_search_parallel(self, pattern, flags, items, workers, first_only):
+        # Several chunks per worker, so that one with a few long texts does not
+        # leave the others idle. Each worker reads its own texts. Only a few
+        # chunks per worker are queued at a time, so stopping early wastes little.
+        items_by_name = {item.name: item for item in items}
+        texts = [(item.name, item.extracted_text_fn,
+                  self.corpus().location(item) if self.use_corpus else None) for item in items]
+        n_chunks = min(len(texts), 4 * workers)
+        chunk_size = -(-len(texts) // n_chunks)
+        chunks = iter([texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)])
+        logger.debug(f'searching {len(items)} items in {n_chunks} chunks over {workers} processes')
+        # Imported here: multiprocessing is slow to import, and most commands never search.
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(workers)
+        futures = deque()
+        try:
+            for chunk in itertools.islice(chunks, 2 * workers):
+                futures.append(pool.submit(_search_texts, pattern, flags, chunk, first_only))
+            while futures:
+                results = futures.popleft().result()
+                for chunk in itertools.islice(chunks, 1):
+                    futures.append(pool.submit(_search_texts, pattern, flags, chunk, first_only))
+                for name, spans in results:
+                    for span in spans:
+                        yield items_by_name[name], span
+        finally:
+            for future in futures:
+                future.cancel()
+            pool.shutdown()
+
+    def _trigram_candidates(self, items, pattern, flags):
+        query = trigram.required_trigrams(pattern, flags)
+        if query is None:
+            return items
+        fresh, stale = self.search_index().split_fresh(items)
+        doc_ids = self.search_index().trigram_candidates(query)
+        candidates = {item.name for doc_id, item in fresh.items() if doc_id in doc_ids}
+        candidates.update(item.name for item in stale)
+        logger.debug(f'trigram prefilter: {len(candidates)} of {len(items)} items to scan')
+        return [item for item in items if item.name in candidates]
 
     def _check_journals(self, bib_data):
         jmap = load_journal_abbr_name_map(self.data_dir)
@@ -659,6 +1383,8 @@ class LitMan:
                 logger.warning(f'NO DOI: {k}')
 
     def check_bib(self, bib_fn):
+        from pybtex.database import parse_file as parse_bib_file
+
         bib_data = parse_bib_file(bib_fn)
         _check_people(bib_data)
         self._check_journals(bib_data)
@@ -678,15 +1404,17 @@ class LitMan:
         return missing
 
     def cleanup_report(self, tag_filter=None):
-        items = self.get_items(tag_filter, has_bib=True)
-
         bibname_to_items = defaultdict(list)
         people = defaultdict(set)
         journals = defaultdict(list)
         doi_fixes = []
         missing_doi = 0
+        formatting = defaultdict(list, delim=Counter())
+        n_items = 0
 
-        for item in items:
+        for item in self.iter_items(tag_filter, has_bib=True):
+            n_items += 1
+            self._check_formatting(item, formatting)
             entry = item.bib_entry()
             bibname_to_items[item.bib_name()].append(item.name)
 
@@ -743,32 +1471,34 @@ class LitMan:
                 ndup += 1
         print(f'  ({ndup} duplicated cite keys)\n')
 
-        self._formatting_report(items)
+        self._formatting_report(formatting)
 
-        print(f'=== SUMMARY: {len(items)} items with a bib; {missing_doi} missing a DOI '
+        print(f'=== SUMMARY: {n_items} items with a bib; {missing_doi} missing a DOI '
               f'(run `litman find-doi` to fill them) ===')
 
-    def _formatting_report(self, items):
-        delim = Counter()
-        odd_type, single_dash, key_mismatch, overesc = [], [], [], []
-        for item in items:
-            with open(item.bib_fn) as f:
-                t = f.read()
-            q = len(re.findall(r'=\s*"', t))
-            b = len(re.findall(r'=\s*\{', t))
-            delim['braces' if b > q else 'quotes'] += 1
-            m = re.search(r'^@(\w+)\{([^,]+),', t, re.M)
-            if m:
-                if not m.group(1).islower():
-                    odd_type.append((item.name, m.group(1)))
-                if m.group(2).strip() != item.name:
-                    key_mismatch.append((item.name, m.group(2).strip()))
-            mp = re.search(r'pages\s*=\s*["{]([^"}]*)', t, re.I)
-            if mp and '--' not in mp.group(1) and re.search(r'\d-\d', mp.group(1)):
-                single_dash.append((item.name, mp.group(1)))
-            if re.search(r'\\{2,}[_%&#$]', t):
-                overesc.append(item.name)
-
+    def _check_formatting(self, item, found):
+        # Adds item's formatting issues to found, for _formatting_report.
+        with open(item.bib_fn) as f:
+            t = f.read()
+        q = len(re.findall(r'=\s*"', t))
+        b = len(re.findall(r'=\s*\{', t))
+        found['delim']['braces' if b > q else 'quotes'] += 1
+        m = re.search(r'^@(\w+)\{([^,]+),', t, re.M)
+        if m:
+            if not m.group(1).islower():
+                found['odd_type'].append((item.name, m.group(1)))
+            if m.group(2).strip() != item.name:
+                found['key_mismatch'].append((item.name, m.group(2).strip()))
+        mp = re.search(r'pages\s*=\s*["{]([^"}]*)', t, re.I)
+        if mp and '--' not in mp.group(1) and re.search(r'\d-\d', mp.group(1)):
+            found['single_dash'].append((item.name, mp.group(1)))
+        if re.search(r'\\{2,}[_%&#$]', t):
+            found['overesc'].append(item.name)
+
+    def _formatting_report(self, found):
+        delim, odd_type, single_dash, key_mismatch, overesc = (
+            found['delim'], found['odd_type'], found['single_dash'], found['key_mismatch'],
+            found['overesc'])
         print('=== FORMATTING ===')
         print(f'  value delimiter (dominant per file): {dict(delim)}')
         print(f'  non-lowercase @type ({len(odd_type)}): {odd_type}')
@@ -793,11 +1523,12 @@ class LitMan:
         return canon
 
     def normalize(self, apply=False, tag_filter=None):
-        items = self.get_items(tag_filter, has_bib=True)
-        canon = self._journal_canonical_map(items)
+        # Two passes, as every journal spelling is needed before any can be fixed; the
+        # first streams the scan, and the second goes over the (by then scanned) items.
+        canon = self._journal_canonical_map(self.iter_items(tag_filter, has_bib=True))
 
         n_doi = n_journal = n_fmt = 0
-        for item in items:
+        for item in self.iter_items(tag_filter, has_bib=True):
             entry = item.bib_entry()
 
             if 'doi' in entry.fields and entry.fields['doi'].strip():
@@ -935,6 +1666,8 @@ class LitMan:
         return bib_data
 
     def _create_bib(self, cites):
+        from pybtex.database import BibliographyData
+
         items = []
         for cite in cites:
             try:
@@ -955,15 +1688,13 @@ class LitMan:
 
 
     def stats(self):
-        if not self._scanned:
-            self._scan()
         stat_counters = defaultdict(Counter)
 
-        for item in self.get_items():
+        for item in self.iter_items():
             if item.has_bib:
                 stat_counters['year'][item.year()] += 1
-                if 'journal' in item.bib_entry().fields:
-                    stat_counters['journal'][item.bib_entry().fields['journal'].lower()] += 1
+                if item.journal():
+                    stat_counters['journal'][item.journal().lower()] += 1
 
             for tag in item.tags:
                 stat_counters['tag'][tag] += 1
@@ -975,28 +1706,158 @@ class LitMan:
         return stat_counters
 
     def _scan(self):
-        if self._scanned:
-            return
-        self._scanned = True
-        self.max_itemname_len = 0
+        for _ in self._iter_scan():
+            pass
+
+    def _iter_scan(self):
+        """Scan lit_dir if it has not been, generating each item as it is added.
 
+        A scan that is suspended (in iter_items) is shared: calling this again
+        picks it up where it left off rather than starting another. It is advanced
+        with next() rather than `yield from`, so that closing one of these
+        generators does not close the scan under any other.
+        """
+        if self._scan_gen is None:
+            if self._scanned:
+                return
+            self._scan_gen = self._scan_items()
+        while self._scan_gen is not None:
+            try:
+                item = next(self._scan_gen)
+            except StopIteration:
+                return
+            yield item
+
+    def _scan_items(self):
+        self.max_itemname_len = 0
         self._item_cache = {}
         self._tags = Counter()
+        self._index = None
+        self._scan_list = []
+
+        catalog_rows = self.catalog().rows() if self.use_catalog else {}
+        changed = []
+
+        self._lit_dir_mtime = _mtime(self.lit_dir)
+        names = self._list_item_names()
+        rows = [catalog_rows.pop(name, None) for name in names]
+
+        complete = False
+        try:
+            for (item, mtimes), row in zip(self._map(self._load_item, names, rows), rows):
+                logger.debug(f'  adding item_dir {item.name}')
+                self._add_item(item)
+                if self._snapshot is not None:
+                    self._snapshot[item.name] = mtimes
+                if self.use_catalog and (row is None or catalog.row_mtimes(row) != mtimes):
+                    changed.append((item, mtimes))
+                yield item
+
+            # Tags are counted here rather than in _add_item, so that the counts match
+            # the index even if an item's tags were changed while the scan was suspended.
+            for item in self._scan_list:
+                self._count_tags(item.tags, 1)
+            self._index = ItemIndex(self._scan_list)
+            self._scan_list = None
+            self._scanned = True
+            complete = True
+
+            if self.use_catalog:
+                # Anything left in catalog_rows is no longer in lit_dir.
+                self.catalog().update(changed, removed=list(catalog_rows))
+        finally:
+            self._scan_gen = None
+            if not complete:
+                self._scan_list = None
+                self._item_cache = {}
+                if self._snapshot is not None:
+                    self._snapshot = {}
+
+    def _list_item_names(self):
+        with os.scandir(self.lit_dir) as it:
+            return [dir_entry.name for dir_entry in it
+                    if dir_entry.name[0] != '.' and dir_entry.is_dir()]
+
+    def _map(self, func, *iterables):
+        if self.scan_workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Listing item dirs and reading tags.txt is latency bound on network
+            # filesystems, so overlap it. map() keeps results in input order.
+            with ThreadPoolExecutor(self.scan_workers) as pool:
+                yield from pool.map(func, *iterables)
+        else:
+            yield from map(func, *iterables)
+
+    def _load_item(self, name, catalog_row=None):
+        """(item, mtimes); mtimes is None unless the catalog or a rescan snapshot needs them."""
+        if not self.use_catalog and self._snapshot is None:
+            return LitItem(self, name), None
+        item_dir = os.path.join(self.lit_dir, name)
+        if catalog_row is not None:
+            mtimes = catalog.row_mtimes(catalog_row)
+            if _mtimes_unchanged(item_dir, mtimes):
+                return LitItem(self, name, catalog_row=catalog_row), mtimes
+        dir_mtime = _mtime(item_dir)
+        try:
+            entries = _list_dir(item_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            raise ItemNotFound(f'item {name} not found')
+        item = LitItem(self, name, entries=entries)
+        mtimes = (dir_mtime,) + tuple(entries[fn].stat().st_mtime_ns if fn in entries else None
+                                      for fn in catalog.MTIME_FNS.values())
+        return item, mtimes
+
+    def _add_item(self, item):
+        self.max_itemname_len = max(self.max_itemname_len, len(item.name))
+        self._item_cache[item.name] = item
+        if self._index is None:
+            self._scan_list.append(item)
+        else:
+            self._count_tags(item.tags, 1)
+            self._index.add(item)
+
+    def _remove_item(self, item):
+        self._count_tags(item.tags, -1)
+        del self._item_cache[item.name]
+        self._index.remove(item)
+        self.payloads.discard_item(item)
+        if len(item.name) == self.max_itemname_len:
+            self.max_itemname_len = max(map(len, self._item_cache), default=0)
+
+    def _replace_item(self, item):
+        """Put a reloaded item in place of the one with its name, keeping its position."""
+        old_item = self._item_cache[item.name]
+        self._item_cache[item.name] = item
+        old_tags = self._index.update(item)
+        self._count_tags(old_tags, -1)
+        self._count_tags(item.tags, 1)
+        self.payloads.discard_item(old_item)
+
+    def _item_changed(self, item):
+        """Re-index an item whose tags or has_* flags have changed in place."""
+        if not self._scanned or self._item_cache.get(item.name) is not item:
+            return
+        old_tags = self._index.update(item)
+        self._count_tags(old_tags, -1)
+        self._count_tags(item.tags, 1)
 
-        for item_dir in os.listdir(self.lit_dir):
-            if item_dir[0] == '.':
-                continue
-            if not os.path.isdir(os.path.join(self.lit_dir, item_dir)):
-                continue
-            logger.debug(f'  adding item_dir {item_dir}')
-            item = LitItem(self, item_dir)
-            for tag in item.tags:
-                self._tags[tag] += 1
-            self.max_itemname_len = max(self.max_itemname_len, len(item.name))
-            self.items.append(item)
-            self._item_cache[item.name] = item
+    def _count_tags(self, tags, sign):
+        for tag in tags:
+            self._tags[tag] += sign
+            if self._tags[tag] <= 0:
+                del self._tags[tag]
+
+    def update_tags(self, items, add=(), remove=(), rename=None):
+        """Add, remove and rename tags on many items; returns the items that changed.
+
+        Each item's tags.txt is rewritten once, and the tag counts and index are
+        updated in place rather than by a rescan.
+        """
+        return [item for item in items if item.update_tags(add, remove, rename)]
 
     def rename_tag(self, tag_old, tag_new):
         self._scan()
-        for item in self.get_items():
-            item.rename_tag(tag_old, tag_new)
+        # Straight from the index: tag_old is a tag name, not a tag expression.
+        items = self._index.select(self._index.tag_bits(tag_old))
+        return self.update_tags(items, rename={tag_old: tag_new})
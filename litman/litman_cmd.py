@@ -1,18 +1,49 @@
 import os
+from signal import signal, SIGPIPE, SIG_DFL
 
 import litman.cmds as cmds
 from litman.command_parser import parse_commands
 from litman.setup_logging import setup_logger, add_file_logging
-from litman.litman import LitMan, load_config
+from litman.tag_query import TagQueryError
 
 LITMAN_BASEDIR = '$HOME/LitMan/literature'
 
 ARGS = [(['--DEBUG', '-D'], {'action': 'store_true', 'default': False}),
-        (['--litman-dir', '-l'], {'help': 'LitMan directory', 'default': LITMAN_BASEDIR})]
+        (['--litman-dir', '-l'], {'help': 'LitMan directory', 'default': LITMAN_BASEDIR}),
+        (['--no-daemon'], {'help': 'do not use a running `litman daemon`', 'action': 'store_true'})]
+
+
+def parse_args(cmdline_args):
+    return parse_commands('litman', ARGS, cmds, cmdline_args)
+
+
+def _run_by_daemon(litman_dir, cmd, args, argv):
+    """Run cmd in a running `litman daemon`; False if there is none or it cannot."""
+    # Only imported for the commands that can use it, to keep startup fast.
+    from litman import daemon
+
+    if not daemon.daemon_ok(cmd, args):
+        return False
+    reply = None
+    for reply in daemon.replies(litman_dir, {'op': 'run', 'argv': argv[1:]}):
+        if 'output' not in reply:
+            break
+        # Handle a broken pipe:
+        signal(SIGPIPE, SIG_DFL)
+        print(reply['output'], end='', flush=True)
+    else:
+        if reply is None:
+            return False
+        raise Exception('daemon: connection closed before the command finished')
+    if not reply['ok']:
+        if reply.get('error_type') == 'TagQueryError':
+            raise TagQueryError(reply['error'])
+        raise Exception(f'daemon: {reply["error"]}')
+    return True
 
 
 def main(argv):
-    litman_cmds, args = parse_commands('litman', ARGS, cmds, argv[1:])
+    litman_cmds, args = parse_args(argv[1:])
     litman_dir = os.path.expandvars(args.litman_dir)
     cmd = litman_cmds[args.cmd_name]
 
@@ -23,6 +54,13 @@ def main(argv):
 
     logger = setup_logger(debug, colour=True)
     cmd_string = ' '.join(argv)
+    if getattr(cmd, 'RUN_OUTSIDE_SUITE', False):
+        # e.g. version: no LitMan dir or config needed.
+        return cmd.main(None, args)
+
+    # Not imported at the top: the commands above do without it, and it is slow.
+    from litman.litman import LitMan, load_config, litman_options
+
     litmanrc_fn, config = load_config()
     if config:
         litman_dir = config['litman_dir']
@@ -49,7 +87,19 @@ def main(argv):
         logger.debug(f'reading config {litmanrc_fn}')
     logger.debug(f'using litman_dir {litman_dir}')
 
-    litman = LitMan(config['litman_dir'])
+    try:
+        if not args.no_daemon and hasattr(cmd, 'DAEMON_OK'):
+            if _run_by_daemon(config['litman_dir'], cmd, args, argv):
+                logger.debug('ran by daemon')
+                return
+
+        litman = LitMan(config['litman_dir'], **litman_options(config))
 
-    logger.debug(f'dispatching to {cmd}')
-    return cmd.main(litman, args)
+        logger.debug(f'dispatching to {cmd}')
+        try:
+            return cmd.main(litman, args)
+        finally:
+            litman.close()
+    except TagQueryError as ex:
+        logger.error(f'bad --tag-filter: {ex}')
+        return 1
@@ -0,0 +1,48 @@
+"""Versioned marshal files for the caches in <litman_dir>/data, and when a file
+is old enough to be cached by its mtime.
+
+bib_cache, corpus and word_index each save a dict with marshal, with a
+'version' key. A file of another version, or one that cannot be read, is
+ignored (the cache starts empty) rather than being an error. Files are written
+to a temporary file and renamed into place, so a reader never sees half of one.
+
+Every cache in litman trusts a file's mtime (and size) to say whether it has
+changed, so each one -- these, the catalog and the search index -- also leaves
+out files that is_racy says were modified too recently to trust.
+"""
+import os
+import time
+import marshal
+from logging import getLogger
+
+logger = getLogger('litman.marshal_cache')
+
+# Like git's "racy" index entries: a file modified this recently could be rewritten
+# again without its (coarse-grained) mtime changing, so it is not cached yet.
+RACY_SECONDS = 2
+
+
+def is_racy(mtime_ns):
+    """Whether a file with this mtime was modified too recently to be cached by it."""
+    return time.time() - mtime_ns / 1e9 <= RACY_SECONDS
+
+
+def load(fn, version, description):
+    """The dict saved in fn, or None if there is none, or it is unreadable or another version."""
+    if not os.path.exists(fn):
+        return None
+    try:
+        with open(fn, 'rb') as f:
+            data = marshal.load(f)
+        if data['version'] == version:
+            return data
+    except (EOFError, ValueError, TypeError, KeyError) as ex:
+        logger.warning(f'ignoring unreadable {description} {fn}: {ex}')
+    return None
+
+
+def save(fn, version, **data):
+    tmp_fn = fn + '.tmp'
+    with open(tmp_fn, 'wb') as f:
+        marshal.dump(dict(data, version=version), f)
+    os.replace(tmp_fn, fn)
@@ -0,0 +1,78 @@
+"""A size-bounded LRU cache for items' large payloads.
+
+LitItem used to keep its extracted text, notes and parsed ref.bib for as long
+as the item lived, so a command that reads them all (search, word-index,
+stats) held every one in memory at once. Instead LitMan owns one
+PayloadCache, and each LitItem accessor looks its payload up there, reading
+it again if it has been evicted.
+
+The budget is `cache_mb` in the [litman] section of .litmanrc (default
+DEFAULT_CACHE_MB; 0 disables caching). Sizes are estimates: sys.getsizeof for
+text, and BIB_PAYLOAD_BYTES for a parsed entry ('bib', from the bib cache or
+pybtex, or 'bib_fields', from the native ref.bib reader).
+"""
+import sys
+from collections import OrderedDict
+from logging import getLogger
+
+logger = getLogger('litman.payload_cache')
+
+DEFAULT_CACHE_MB = 256
+# Rough size of a parsed ref.bib (pybtex Entry, Persons, a bib_cache record, or the
+# native reader's fields and authors).
+BIB_PAYLOAD_BYTES = 4096
+KINDS = ['text', 'notes', 'bib', 'bib_fields']
+MISSING = object()
+
+
+def payload_size(value):
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    return BIB_PAYLOAD_BYTES
+
+
+class PayloadCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        # {(item, kind): (value, size)}, least recently used first.
+        self._entries = OrderedDict()
+        self.n_bytes = 0
+        self.n_evicted = 0
+
+    def __repr__(self):
+        return f'PayloadCache({self.max_bytes})'
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, item, kind):
+        """The cached value, or MISSING."""
+        key = (item, kind)
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, item, kind, value):
+        """Cache value (evicting others to make room), and return it."""
+        self.discard(item, kind)
+        size = payload_size(value)
+        if size > self.max_bytes:
+            return value
+        self._entries[(item, kind)] = (value, size)
+        self.n_bytes += size
+        while self.n_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.n_bytes -= evicted_size
+            self.n_evicted += 1
+        return value
+
+    def discard(self, item, kind):
+        entry = self._entries.pop((item, kind), None)
+        if entry is not None:
+            self.n_bytes -= entry[1]
+
+    def discard_item(self, item):
+        for kind in KINDS:
+            self.discard(item, kind)
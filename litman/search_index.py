@@ -0,0 +1,335 @@
+"""Persistent indexes over items' extracted text, for `litman search`.
+
+Text is split into \\w+ tokens, lowercased. For every (term, item) the index
+stores each occurrence's token position and character span, so word and
+phrase queries (`search -w`) are answered without reading any
+extracted_text.txt, and still give the offsets that `litman search` shows
+context around.
+
+For regex searches, the items containing each trigram are also recorded (see
+litman.trigram). Trigram postings are appended per update, one row per
+trigram per batch; entries for dropped or re-indexed items are left in place
+(doc ids are never reused, and only live ids are used) until there are
+COMPACT_BATCHES batches, when they are merged.
+
+The postings also give each term's frequency in each item, and its document
+frequency, which with the item lengths is all that BM25 needs to rank items
+for `search --rank`: ranking reads only the postings of the query terms.
+
+Lives at <litman_dir>/data/search_index.sqlite and is brought up to date by
+`litman word-index`. An item is only re-indexed when its extracted_text.txt
+has changed (mtime or size); items that are not indexed, or have changed
+since, are reported as stale so that search can fall back to scanning them.
+A text modified too recently for its mtime to be trusted (see
+marshal_cache.is_racy) is left out of the index until the next update.
+"""
+import os
+import re
+import math
+import heapq
+from array import array
+from logging import getLogger
+
+from litman import marshal_cache, trigram
+
+logger = getLogger('litman.search_index')
+
+SEARCH_INDEX_BASENAME = 'search_index.sqlite'
+# Bump when the schema or tokenization changes; an out of date index is rebuilt.
+SCHEMA_VERSION = 3
+COMPACT_BATCHES = 16
+# BM25 parameters, with the usual values.
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Tokens in the window that rank() picks the best snippet from.
+SNIPPET_TOKENS = 20
+# Stay under SQLite's limit on the number of ? parameters in a statement.
+MAX_SQL_VARS = 900
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """[(term, start, end)] for each token in text."""
+    return [(m.group().lower(), m.start(), m.end()) for m in TOKEN_RE.finditer(text)]
+
+
+def phrase_regex(terms):
+    """A regex matching the same text as the phrase query for terms, for items
+    that have to be scanned rather than looked up."""
+    return r'(?<!\w)' + r'\W+'.join(re.escape(term) for term in terms) + r'(?!\w)'
+
+
+def _stat(fn):
+    st = os.stat(fn)
+    return st.st_mtime_ns, st.st_size
+
+
+class SearchIndex:
+    def __init__(self, index_fn):
+        import sqlite3
+
+        self.index_fn = index_fn
+        self._conn = sqlite3.connect(index_fn)
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            logger.debug(f'search index schema {version} != {SCHEMA_VERSION}: rebuilding')
+            self._conn.executescript('DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS postings; '
+                                     'DROP TABLE IF EXISTS trigrams; DROP TABLE IF EXISTS totals;')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS docs ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, mtime_ns INTEGER, '
+            'size INTEGER, length INTEGER);'
+            # positions: array('I') of (token position, start, end) per occurrence.
+            'CREATE TABLE IF NOT EXISTS postings ('
+            'term TEXT, doc INTEGER, positions BLOB, PRIMARY KEY (term, doc)) WITHOUT ROWID;'
+            'CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);'
+            # docs: array('I') of doc ids.
+            'CREATE TABLE IF NOT EXISTS trigrams ('
+            'tri INTEGER, batch INTEGER, docs BLOB, PRIMARY KEY (tri, batch)) WITHOUT ROWID;'
+            # One row: the number of docs and their total length in tokens, for BM25.
+            'CREATE TABLE IF NOT EXISTS totals (n_docs INTEGER, n_tokens INTEGER);')
+        self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._conn.commit()
+
+    def __repr__(self):
+        return f"SearchIndex('{self.index_fn}')"
+
+    def docs(self):
+        """{item name: (doc id, mtime_ns, size)}."""
+        return {name: (doc_id, mtime_ns, size) for doc_id, name, mtime_ns, size
+                in self._conn.execute('SELECT id, name, mtime_ns, size FROM docs')}
+
+    def split_fresh(self, items):
+        """({doc id: item} for items whose index entry is current, [stale items])."""
+        docs = self.docs()
+        fresh = {}
+        stale = []
+        for item in items:
+            doc = docs.get(item.name)
+            try:
+                current = doc is not None and doc[1:] == _stat(item.extracted_text_fn)
+            except FileNotFoundError:
+                current = False
+            if current:
+                fresh[doc[0]] = item
+            else:
+                stale.append(item)
+        return fresh, stale
+
+    def is_current(self, item):
+        """Whether item's index entry is up to date with its extracted text."""
+        row = self._conn.execute('SELECT mtime_ns, size FROM docs WHERE name = ?',
+                                 (item.name,)).fetchone()
+        try:
+            return row is not None and row == _stat(item.extracted_text_fn)
+        except FileNotFoundError:
+            return False
+
+    def update(self, items):
+        """Index the items whose text has changed, and drop any that are not in items."""
+        docs = self.docs()
+        names = set()
+        n_indexed = 0
+        n_deleted = 0
+        # {trigram code: array of the doc ids added in this batch}
+        trigram_docs = {}
+        with self._conn:
+            for item in items:
+                names.add(item.name)
+                try:
+                    mtime_ns, size = _stat(item.extracted_text_fn)
+                except FileNotFoundError:
+                    continue
+                doc = docs.get(item.name)
+                if doc is not None and doc[1:] == (mtime_ns, size):
+                    continue
+                if doc is not None:
+                    self._delete(doc[0])
+                    n_deleted += 1
+                if marshal_cache.is_racy(mtime_ns):
+                    continue
+                self._add(item, mtime_ns, size, trigram_docs)
+                n_indexed += 1
+            removed = [doc[0] for name, doc in docs.items() if name not in names]
+            for doc_id in removed:
+                self._delete(doc_id)
+            if trigram_docs:
+                self._add_trigram_batch(trigram_docs)
+            if n_deleted or n_indexed or removed:
+                self._conn.execute('DELETE FROM totals')
+                self._conn.execute('INSERT INTO totals SELECT COUNT(*), COALESCE(SUM(length), 0) '
+                                   'FROM docs')
+        logger.debug(f'search index: {n_indexed} indexed, {len(removed)} removed')
+        return n_indexed, len(removed)
+
+    def _add(self, item, mtime_ns, size, trigram_docs):
+        text = item.read_extracted_text()
+        tokens = tokenize(text)
+        positions = {}
+        for pos, (term, start, end) in enumerate(tokens):
+            positions.setdefault(term, array('I')).extend((pos, start, end))
+        cursor = self._conn.execute(
+            'INSERT INTO docs (name, mtime_ns, size, length) VALUES (?, ?, ?, ?)',
+            (item.name, mtime_ns, size, len(tokens)))
+        doc_id = cursor.lastrowid
+        self._conn.executemany('INSERT INTO postings VALUES (?, ?, ?)',
+                               [(term, doc_id, arr.tobytes()) for term, arr in positions.items()])
+        for code in trigram.text_trigrams(text):
+            trigram_docs.setdefault(code, array('I')).append(doc_id)
+
+    def _add_trigram_batch(self, trigram_docs):
+        batch = self._conn.execute('SELECT COALESCE(MAX(batch), 0) + 1 FROM trigrams').fetchone()[0]
+        self._conn.executemany('INSERT INTO trigrams VALUES (?, ?, ?)',
+                               [(code, batch, arr.tobytes()) for code, arr in trigram_docs.items()])
+        n_batches = self._conn.execute('SELECT COUNT(DISTINCT batch) FROM trigrams').fetchone()[0]
+        if n_batches >= COMPACT_BATCHES:
+            self._compact_trigrams()
+
+    def _compact_trigrams(self):
+        live = set(self._doc_ids())
+        merged = {}
+        for code, blob in self._conn.execute('SELECT tri, docs FROM trigrams'):
+            arr = array('I')
+            arr.frombytes(blob)
+            merged.setdefault(code, array('I')).extend(doc_id for doc_id in arr if doc_id in live)
+        self._conn.execute('DELETE FROM trigrams')
+        self._conn.executemany('INSERT INTO trigrams VALUES (?, 1, ?)',
+                               [(code, arr.tobytes()) for code, arr in merged.items() if arr])
+        logger.debug(f'compacted trigrams for {len(live)} docs')
+
+    def _doc_ids(self):
+        return [doc_id for doc_id, in self._conn.execute('SELECT id FROM docs')]
+
+    def trigram_candidates(self, query):
+        """Doc ids that can match a trigram query (see trigram.required_trigrams),
+        or None if the query does not narrow them down."""
+        if query is None:
+            return None
+        op, arg = query
+        if op == 'tri':
+            doc_ids = set()
+            for blob, in self._conn.execute('SELECT docs FROM trigrams WHERE tri = ?', (arg,)):
+                arr = array('I')
+                arr.frombytes(blob)
+                doc_ids.update(arr)
+            return doc_ids
+        elif op == 'and':
+            doc_ids = None
+            for child in arg:
+                child_ids = self.trigram_candidates(child)
+                doc_ids = child_ids if doc_ids is None else doc_ids & child_ids
+                if not doc_ids:
+                    break
+            return doc_ids
+        else:
+            doc_ids = set()
+            for child in arg:
+                doc_ids |= self.trigram_candidates(child)
+            return doc_ids
+
+    def _delete(self, doc_id):
+        self._conn.execute('DELETE FROM postings WHERE doc = ?', (doc_id,))
+        self._conn.execute('DELETE FROM docs WHERE id = ?', (doc_id,))
+
+    def _postings(self, term):
+        """{doc id: array of (token position, start, end)} for term."""
+        postings = {}
+        for doc_id, blob in self._conn.execute(
+                'SELECT doc, positions FROM postings WHERE term = ?', (term,)):
+            arr = array('I')
+            arr.frombytes(blob)
+            postings[doc_id] = arr
+        return postings
+
+    def phrase_spans(self, terms):
+        """{doc id: [(start, end), ...]} for each occurrence of the phrase terms."""
+        postings = []
+        for term in terms:
+            term_postings = self._postings(term)
+            if not term_postings:
+                return {}
+            postings.append(term_postings)
+        doc_ids = set(postings[0]).intersection(*postings[1:])
+
+        spans = {}
+        for doc_id in doc_ids:
+            first = postings[0][doc_id]
+            # For each later term: {token position: end offset}.
+            rest = [dict(zip(p[doc_id][0::3], p[doc_id][2::3])) for p in postings[1:]]
+            doc_spans = []
+            for pos, start, end in zip(first[0::3], first[1::3], first[2::3]):
+                for offset, term_ends in enumerate(rest, 1):
+                    end = term_ends.get(pos + offset)
+                    if end is None:
+                        break
+                else:
+                    doc_spans.append((start, end))
+            if doc_spans:
+                spans[doc_id] = doc_spans
+        return spans
+
+    def rank(self, terms, top_k=10):
+        """[(item name, score, (start, end))] for the top_k docs by BM25 score
+        for terms, best first, with the span of each doc's best snippet: the
+        SNIPPET_TOKENS window with the most distinct terms (then occurrences).
+
+        Only the postings of terms are read, so this takes time in proportion
+        to how many docs have them, not to the size of the index.
+        """
+        row = self._conn.execute('SELECT n_docs, n_tokens FROM totals').fetchone()
+        if row is None or not row[0]:
+            return []
+        n_docs, n_tokens = row
+        avg_length = n_tokens / n_docs
+        # {doc id: {term: tf}}; positions hold 3 uint32s per occurrence.
+        tfs = {}
+        dfs = {}
+        for term in set(terms):
+            for doc_id, n_bytes in self._conn.execute(
+                    'SELECT doc, length(positions) FROM postings WHERE term = ?', (term,)):
+                tfs.setdefault(doc_id, {})[term] = n_bytes // 12
+                dfs[term] = dfs.get(term, 0) + 1
+        if not tfs:
+            return []
+        idfs = {term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for term, df in dfs.items()}
+        # {doc id: (name, length)}
+        docs = {}
+        doc_ids = list(tfs)
+        for i in range(0, len(doc_ids), MAX_SQL_VARS):
+            chunk = doc_ids[i:i + MAX_SQL_VARS]
+            docs.update((doc_id, (name, length)) for doc_id, name, length in self._conn.execute(
+                f'SELECT id, name, length FROM docs WHERE id IN ({",".join("?" * len(chunk))})',
+                chunk))
+
+        def score(doc_id):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * docs[doc_id][1] / avg_length)
+            return sum(idfs[term] * tf * (BM25_K1 + 1) / (tf + norm)
+                       for term, tf in tfs[doc_id].items())
+
+        scores = [(score(doc_id), doc_id) for doc_id in docs]
+        return [(docs[doc_id][0], doc_score, self._best_span(doc_id, tfs[doc_id]))
+                for doc_score, doc_id in heapq.nlargest(top_k, scores)]
+
+    def _best_span(self, doc_id, terms):
+        occurrences = []
+        for term in terms:
+            row = self._conn.execute('SELECT positions FROM postings WHERE term = ? AND doc = ?',
+                                     (term, doc_id)).fetchone()
+            arr = array('I')
+            arr.frombytes(row[0])
+            occurrences.extend((pos, start, end, term)
+                               for pos, start, end in zip(arr[0::3], arr[1::3], arr[2::3]))
+        occurrences.sort()
+        best = None
+        first = 0
+        for last, (pos, _, end, _) in enumerate(occurrences):
+            while occurrences[first][0] <= pos - SNIPPET_TOKENS:
+                first += 1
+            window = occurrences[first:last + 1]
+            key = (len({occ[3] for occ in window}), len(window))
+            if best is None or key > best[0]:
+                best = (key, (window[0][1], end))
+        return best[1]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,138 @@
+"""Boolean tag expressions for --tag-filter.
+
+    convection AND (obs OR model) AND NOT review
+
+A plain tag is the simplest expression, so existing single-tag filters still work,
+and a filter that is the whole name of a tag matches that tag even if it contains
+spaces (as tags made from directory names by import-pdf can): -t "my tag".
+AND/OR/NOT must be upper case; within a longer expression, quote a tag that
+contains spaces or parentheses, or that is itself one of the keywords:
+"NOT" AND obs.
+
+Expressions are parsed to a small tree and evaluated over the per-tag bitmaps of
+an ItemIndex.
+"""
+import re
+from functools import lru_cache
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+KEYWORDS = ['AND', 'OR', 'NOT']
+
+
+class TagQueryError(ValueError):
+    pass
+
+
+def _tokenize(query):
+    tokens = []
+    pos = 0
+    query = query.rstrip()
+    while pos < len(query):
+        m = _TOKEN_RE.match(query, pos)
+        if not m:
+            raise TagQueryError(f'cannot parse tag expression at: {query[pos:]!r}')
+        lparen, rparen, quoted, word = m.groups()
+        if quoted is not None:
+            tokens.append(('tag', quoted))
+        elif word in KEYWORDS:
+            tokens.append((word, word))
+        elif word is not None:
+            tokens.append(('tag', word))
+        else:
+            tokens.append((lparen or rparen, lparen or rparen))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, query):
+        self.query = query
+        self.tokens = _tokenize(query)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind):
+        if self.peek() != kind:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else 'end of expression'
+            raise TagQueryError(f'expected {kind} but found {found!r} in {self.query!r}')
+        self.pos += 1
+        return self.tokens[self.pos - 1][1]
+
+    def parse(self):
+        node = self.or_expr()
+        if self.peek() is not None:
+            raise TagQueryError(f'unexpected {self.tokens[self.pos][1]!r} in {self.query!r}')
+        return node
+
+    def or_expr(self):
+        nodes = [self.and_expr()]
+        while self.peek() == 'OR':
+            self.take('OR')
+            nodes.append(self.and_expr())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def and_expr(self):
+        nodes = [self.not_expr()]
+        while self.peek() == 'AND':
+            self.take('AND')
+            nodes.append(self.not_expr())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def not_expr(self):
+        if self.peek() == 'NOT':
+            self.take('NOT')
+            return ('not', self.not_expr())
+        if self.peek() == '(':
+            self.take('(')
+            node = self.or_expr()
+            self.take(')')
+            return node
+        return ('tag', self.take('tag'))
+
+
+@lru_cache(maxsize=64)
+def parse(query):
+    """Parse a tag expression into a tree of ('tag', name), ('not', node), ('and'/'or', [nodes])."""
+    return _Parser(query).parse()
+
+
+def parse_filter(query, is_tag):
+    """parse(query), except that a query for which is_tag(query) is true is that tag."""
+    if is_tag(query):
+        return ('tag', query)
+    return parse(query)
+
+
+def is_plain_tag(query):
+    """Whether query can only mean the tag of that name, whatever tags exist."""
+    try:
+        return parse(query) == ('tag', query)
+    except TagQueryError:
+        return False
+
+
+def evaluate(node, tag_bits, all_bits):
+    """Bitmap of the items matching node; tag_bits(tag) gives the bitmap for one tag."""
+    op, arg = node
+    if op == 'tag':
+        return tag_bits(arg)
+    elif op == 'not':
+        return all_bits & ~evaluate(arg, tag_bits, all_bits)
+    elif op == 'and':
+        bits = all_bits
+        for child in arg:
+            bits &= evaluate(child, tag_bits, all_bits)
+        return bits
+    else:
+        bits = 0
+        for child in arg:
+            bits |= evaluate(child, tag_bits, all_bits)
+        return bits
+
+
+
+def matches(node, tags):
+    """Whether an item with these tags matches node (one item, so no index needed)."""
+    return bool(evaluate(node, lambda tag: int(tag in tags), 1))
@@ -0,0 +1,71 @@
+"""Scan time and memory per item (see LitItem's __slots__ and packed flags).
+
+    python -m litman.tests.bench_items [--items N] [litman_dir]
+
+Reports the best of --repeats scans, the memory LitMan holds after a scan (items,
+name and tag indexes, rescan snapshot) per item, and the memory freed by dropping
+just the LitItems, per item, with tracemalloc. Without a litman_dir, a synthetic
+library of --items items is made in a temporary dir.
+"""
+import gc
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from litman.litman import LitMan
+from litman.tests.synthetic_library import make_library
+
+
+def bench(litman_dir, repeats):
+    # Warm the page cache and the imports.
+    LitMan(litman_dir)._scan()
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        LitMan(litman_dir)._scan()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    litman = LitMan(litman_dir)
+    litman._scan()
+    scan_bytes = tracemalloc.get_traced_memory()[0]
+    # Just the LitItems: drop everything else that refers to them, then see what is freed.
+    items = litman.items
+    n_items = len(items)
+    litman._index = None
+    litman._item_cache = {}
+    litman._snapshot = None
+    if 'items' in vars(litman):
+        # Before LitMan.items became a property, it was a list of its own.
+        litman.items = []
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    del items
+    gc.collect()
+    item_bytes = before - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'{n_items} items: scan {min(times):.3f}s, scan memory {scan_bytes / n_items:.0f} B/item, '
+          f'LitItems {item_bytes / n_items:.0f} B/item')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('litman_dir', nargs='?')
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        litman_dir = args.litman_dir
+        if litman_dir is None:
+            litman_dir = tmp_dir
+            make_library(litman_dir, args.items, text_kb=1)
+        bench(litman_dir, args.repeats)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
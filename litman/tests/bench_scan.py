@@ -0,0 +1,70 @@
+"""Scan time against scan_workers (user-facing as `scan_workers` in .litmanrc).
+
+    python -m litman.tests.bench_scan [--items N] [--latency SECONDS] [litman_dir]
+
+Times LitMan._scan(), best of --repeats, for each worker count. --latency adds a
+sleep to every scandir, stat and open that the scan makes, to mimic a network
+filesystem (NFS, SMB, sshfs), which is what the thread pool is for. Without a
+litman_dir, a synthetic library of --items items is made in a temporary dir.
+"""
+import os
+import sys
+import time
+import argparse
+import builtins
+import tempfile
+
+import litman.litman as litman_module
+from litman.litman import LitMan
+from litman.tests.synthetic_library import make_library
+
+WORKERS = [1, 2, 4, 8, 16, 32]
+
+
+def _slow(func, latency):
+    def slow_func(*args, **kwargs):
+        time.sleep(latency)
+        return func(*args, **kwargs)
+    return slow_func
+
+
+def add_latency(latency):
+    litman_module.os.scandir = _slow(os.scandir, latency)
+    litman_module.os.stat = _slow(os.stat, latency)
+    litman_module.open = _slow(builtins.open, latency)
+
+
+def bench(litman_dir, repeats):
+    for workers in WORKERS:
+        times = []
+        for _ in range(repeats):
+            litman = LitMan(litman_dir, scan_workers=workers)
+            start = time.perf_counter()
+            litman._scan()
+            times.append(time.perf_counter() - start)
+        print(f'workers {workers:2d}  {min(times):.3f}s  ({len(litman.items)} items)')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('litman_dir', nargs='?')
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f'{os.cpu_count()} CPUs, latency {args.latency * 1000:g} ms')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        litman_dir = args.litman_dir
+        if litman_dir is None:
+            litman_dir = tmp_dir
+            make_library(litman_dir, args.items, text_kb=1)
+        # Warm the page cache (and the imports) before timing.
+        LitMan(litman_dir)._scan()
+        if args.latency:
+            add_latency(args.latency)
+        bench(litman_dir, args.repeats)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,60 @@
+"""Regex search time against the number of search processes (`search -j`).
+
+    python -m litman.tests.bench_search [--items N] [--pattern REGEX] [litman_dir]
+
+Times LitMan.search, best of --repeats, for each number of workers, and checks
+that every run gives the same matches. The default pattern cannot be narrowed
+down by the trigram prefilter, so every text is matched. LitMan uses at most one
+process per CPU, so on a machine with fewer CPUs than workers the larger counts
+show the same (capped) run. Without a litman_dir, a synthetic library of --items
+items is made in a temporary dir.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from litman.litman import LitMan
+from litman.tests.synthetic_library import make_library
+
+WORKERS = [1, 2, 4, 8]
+PATTERN = r'\w+ion\W+\w+\W+sch\w*'
+
+
+def bench(litman_dir, pattern, repeats):
+    litman = LitMan(litman_dir)
+    expected = None
+    for workers in WORKERS:
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            found = litman.search(pattern, ignore_case=True, workers=workers)
+            times.append(time.perf_counter() - start)
+        found = [(item.name, spans) for item, spans in found]
+        if expected is None:
+            expected = found
+        used = min(workers, os.cpu_count() or 1)
+        print(f'workers {workers} ({used} used)  {min(times):.3f}s  '
+              f'{len(found)} items matched  {"same" if found == expected else "DIFFERENT"}')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('litman_dir', nargs='?')
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--pattern', default=PATTERN)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f'{os.cpu_count()} CPUs')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        litman_dir = args.litman_dir
+        if litman_dir is None:
+            litman_dir = tmp_dir
+            make_library(litman_dir, args.items)
+        bench(litman_dir, args.pattern, args.repeats)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
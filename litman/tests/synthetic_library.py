@@ -0,0 +1,67 @@
+"""A reproducible synthetic library for the benchmarks (bench_*.py).
+
+    python -m litman.tests.synthetic_library <litman_dir> <n_items> [text_kb]
+
+Items get a ref.bib (in both the hand-written and the CrossRef layout) or a
+title.txt, tags, a PDF symlink and text_kb of extracted text, at about the
+proportions of a real library. The same arguments always give the same library.
+"""
+import os
+import random
+import sys
+
+WORDS = ('convection cloud precipitation model observation tropical boundary layer '
+         'scheme parametrization radiation aerosol ocean monsoon diurnal cycle mass flux '
+         'entrainment updraft downdraft shallow deep organisation cold pool wind shear '
+         'humidity temperature satellite radar resolution simulation ensemble forecast').split()
+LAST = ['Smith', 'Jones', 'Muetzelfeldt', 'Holloway', 'Plant', 'Arakawa', 'Emanuel',
+        'Houze', 'Stevens', 'Bony', "O'Gorman", 'Schumacher']
+FIRST = ['John', 'Mark', 'Christopher E.', 'Robert S.', 'Akio', 'Kerry A.', 'Sandrine']
+TAGS = ['convection', 'obs', 'model', 'review', 'radar', 'les', 'gcm', 'tropics']
+
+
+def make_library(litman_dir, n_items, text_kb=20):
+    rng = random.Random(0)
+    lit_dir = os.path.join(litman_dir, 'literature')
+    for dirname in [lit_dir, os.path.join(litman_dir, 'data'),
+                    os.path.join(litman_dir, 'projects')]:
+        os.makedirs(dirname, exist_ok=True)
+    pdf_fn = os.path.abspath(os.path.join(litman_dir, 'dummy.pdf'))
+    open(pdf_fn, 'w').close()
+
+    for i in range(n_items):
+        last = rng.choice(LAST).replace("'", '').lower()
+        year = rng.randint(1950, 2024)
+        name = f'{last}{year}{rng.choice(WORDS)}{i}'
+        item_dir = os.path.join(lit_dir, name)
+        os.makedirs(item_dir)
+        if rng.random() < 0.9:
+            authors = ' and '.join(f'{rng.choice(LAST)}, {rng.choice(FIRST)}'
+                                   for _ in range(rng.randint(1, 4)))
+            title = ' '.join(rng.choice(WORDS) for _ in range(8)).capitalize()
+            with open(os.path.join(item_dir, 'ref.bib'), 'w') as f:
+                if rng.random() < 0.5:
+                    f.write(f'@article{{{name},\n    doi = "10.1175/JAS-D-{i:02d}-0001.1",\n'
+                            f'    author = "{authors}",\n    title = "{{{title}}}",\n'
+                            f'    journal = "Journal of the Atmospheric Sciences",\n'
+                            f'    year = "{year}",\n    volume = "{rng.randint(1, 80)}",\n'
+                            f'    pages = "1--20"\n}}\n')
+                else:
+                    f.write(f' @article{{{name}, title={{{title}}}, volume={{12}}, '
+                            f'DOI={{10.1002/qj.{i}}}, journal={{Q. J. R. Meteorol. Soc.}}, '
+                            f'author={{{authors}}}, year={{{year}}}, month=mar, pages={{1-2}} }}\n')
+        elif rng.random() < 0.5:
+            with open(os.path.join(item_dir, 'title.txt'), 'w') as f:
+                f.write('A title\n')
+        if rng.random() < 0.8:
+            with open(os.path.join(item_dir, 'tags.txt'), 'w') as f:
+                f.write(','.join(sorted(set(rng.sample(TAGS, rng.randint(1, 3))))) + '\n')
+        if rng.random() < 0.8:
+            os.symlink(pdf_fn, os.path.join(item_dir, f'{name}.pdf'))
+            with open(os.path.join(item_dir, 'extracted_text.txt'), 'w') as f:
+                words = [rng.choice(WORDS) for _ in range(text_kb * 1024 // 8)]
+                f.write(' '.join(words[:50]) + '\n' + ' '.join(words[50:]) + '\n')
+
+
+if __name__ == '__main__':
+    make_library(sys.argv[1], int(sys.argv[2]), *[int(arg) for arg in sys.argv[3:]])
@@ -0,0 +1,32 @@
+import marshal
+import os
+import time
+
+from litman.bib_cache import BibCache
+
+BIB = '@article{{{key}, title={{A title}}, author={{Smith, J}}, year={{2001}}, journal={{J}}}}\n'
+
+
+def _write_bib(path, key):
+    path.write_text(BIB.format(key=key))
+    # Old enough to be cached (see marshal_cache.is_racy).
+    old = time.time() - 60
+    os.utime(path, (old, old))
+    return str(path)
+
+
+def test_save_prunes_to_keep_fns(tmp_path):
+    cache_fn = str(tmp_path / 'bib_cache.marshal')
+    bib_fns = [_write_bib(tmp_path / f'{key}.bib', key) for key in ['a2001x', 'b2002y']]
+    cache = BibCache(cache_fn)
+    for bib_fn in bib_fns:
+        assert cache.load(bib_fn)[0] in ('a2001x', 'b2002y')
+    cache.save()
+    with open(cache_fn, 'rb') as f:
+        assert sorted(marshal.load(f)['records']) == sorted(bib_fns)
+
+    cache = BibCache(cache_fn)
+    cache.load(bib_fns[0])
+    cache.save(keep_fns=bib_fns[:1])
+    with open(cache_fn, 'rb') as f:
+        assert list(marshal.load(f)['records']) == bib_fns[:1]
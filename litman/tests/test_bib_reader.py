@@ -0,0 +1,97 @@
+"""The native ref.bib reader (litman.litman._read_bib_fields) against pybtex.
+
+For every input the native reader either gives up (None), or agrees with pybtex
+on the key, the fields and the authors' last names; where pybtex raises, it must
+give up, so that pybtex is the one to report the error.
+"""
+import random
+
+import pytest
+from pybtex.database import parse_file
+
+from litman.litman import _read_bib_fields
+
+FIRSTS = ['John', 'J.', 'Jean-Paul', 'Mary Ann', 'A. B.', '', 'jean', 'Ii, Jr.']
+VONS = ['', 'van', 'van der', 'de la', 'von']
+LASTS = ['Smith', 'Smith-Jones', "O'Gorman", 'Berg', 'fontaine', 'Mc Donald', 'Ab Cd', 'others']
+VALUES = ['{A {B}  c}', '"quoted  {x}  y"', '1999', '{}', '{a,b}', '"a \\"{b}"', '{10.1/a\\_b}',
+          'jan', 'MAR', 'sept', 'dec # " 1"', '"a" # "b"', '{\\"O}', '"a}b"']
+FIELDS = ['title', 'Year', 'DOI', 'journal', 'editor']
+
+
+def _name(rng):
+    first, von, last = rng.choice(FIRSTS), rng.choice(VONS), rng.choice(LASTS)
+    if rng.random() < 0.5:
+        return ' '.join(x for x in [von, last] if x) + (', ' + first if first else '')
+    return ' '.join(x for x in [first, von, last] if x)
+
+
+def _random_bib(rng, i):
+    fields = []
+    if rng.random() < 0.9:
+        and_ = rng.choice([' and ', ' AND '])
+        fields.append(('author', '{' + and_.join(_name(rng) for _ in range(rng.randint(1, 4))) + '}'))
+    for field in FIELDS:
+        if rng.random() < 0.7:
+            fields.append((field, rng.choice(VALUES)))
+    if fields and rng.random() < 0.05:
+        # A duplicate field, perhaps differing in case.
+        field, value = rng.choice(fields)
+        fields.append((rng.choice([field, field.upper()]), value))
+    sep = rng.choice([',\n    ', ', '])
+    text = (rng.choice(['', '% comment\n', '\n'])
+            + f'{rng.choice(["@article", "@Article", " @book"])}{{key{i},{sep[1:]}'
+            + sep.join(f'{k} = {v}' for k, v in fields) + rng.choice(['', '', ','])
+            + '\n}\n' + rng.choice(['', '', '@misc{x, title={y}}']))
+    if rng.random() < 0.05:
+        # Truncated, e.g. just after a "field =".
+        text = text[:rng.randint(0, len(text))]
+    return text
+
+
+def _check(tmp_path, text):
+    """Whether the native reader handled text (rather than leaving it to pybtex)."""
+    bib_fn = tmp_path / 'ref.bib'
+    bib_fn.write_text(text)
+    native = _read_bib_fields(str(bib_fn))
+    try:
+        bib_data = parse_file(str(bib_fn))
+        assert len(bib_data.entries) == 1
+    except Exception:
+        assert native is None, text
+        return False
+    if native is None:
+        return False
+    key, entry = list(bib_data.entries.items())[0]
+    assert native[0] == key, text
+    assert native[1] == {name.lower(): value for name, value in entry.fields.items()}, text
+    assert native[2] == [person.last_names[0] for person in entry.persons.get('author', [])], text
+    return True
+
+
+@pytest.mark.parametrize('text', [
+    '@article{a2001b, title={A}, Title={B}}',
+    '@article{a2001b, title=',
+    '@article{a2001b, title = {A}, year =',
+    '@article{a2001b,',
+    '@article{a2001b, title={A}',
+    '@article{a2001b, title={A}, month = foo}',
+])
+def test_falls_back_on_bad_input(tmp_path, text):
+    (tmp_path / 'ref.bib').write_text(text)
+    assert _read_bib_fields(str(tmp_path / 'ref.bib')) is None
+
+
+def test_crossref_layout(tmp_path):
+    text = ('@article{Smith_2001, title={A {Title}}, volume={12}, ISSN={1234-5678}, '
+            'url={http://dx.doi.org/10.1/abc}, DOI={10.1/abc}, number={3}, '
+            'journal={J. Atmos. Sci.}, publisher={AMS}, author={Smith, John and van der Berg, Ann}, '
+            'year={2001}, month=mar, pages={1-10} }\n')
+    assert _check(tmp_path, text)
+
+
+def test_matches_pybtex(tmp_path):
+    rng = random.Random(1)
+    n_native = sum(_check(tmp_path, _random_bib(rng, i)) for i in range(500))
+    # Many of these are deliberately odd, but plenty should not need pybtex.
+    assert n_native > 30
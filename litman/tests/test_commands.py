@@ -0,0 +1,34 @@
+from collections import OrderedDict
+
+import pytest
+
+import litman.cmds as cmds
+from litman.command_parser import parse_commands
+from litman.litman_cmd import ARGS
+
+
+class BrokenCommands:
+    """Like litman.cmds, but with a command whose module cannot be imported."""
+    commands = OrderedDict([('broken', 'Cannot be imported'), ('version', 'Print version info')])
+
+    @staticmethod
+    def load(command):
+        if command == 'broken':
+            raise ImportError('No module named missing_dependency')
+        return cmds.load(command)
+
+
+def test_every_command_loads():
+    for command in cmds.commands:
+        assert hasattr(cmds.load(command), 'main')
+
+
+def test_broken_command_does_not_stop_others():
+    litman_cmds, args = parse_commands('litman', ARGS, BrokenCommands, ['version'])
+    assert args.cmd_name == 'version'
+    assert list(litman_cmds) == ['version']
+
+
+def test_broken_command_raises_when_run():
+    with pytest.raises(ImportError):
+        parse_commands('litman', ARGS, BrokenCommands, ['broken'])
@@ -0,0 +1,70 @@
+import gc
+import os
+
+import pytest
+
+from litman.litman import LitMan
+
+N_ITEMS = 60
+
+
+@pytest.fixture
+def litman_dir(tmp_path):
+    lit_dir = tmp_path / 'literature'
+    for i in range(N_ITEMS):
+        item_dir = lit_dir / f'author{2000 + i}title'
+        os.makedirs(item_dir)
+        (item_dir / 'tags.txt').write_text('even' if i % 2 == 0 else 'odd')
+    return str(tmp_path)
+
+
+def _names(items):
+    return [item.name for item in items]
+
+
+def test_iter_items_matches_get_items(litman_dir):
+    streamed = _names(LitMan(litman_dir).iter_items())
+    assert streamed == _names(LitMan(litman_dir).get_items())
+    assert len(streamed) == N_ITEMS
+
+
+def test_interleaved_iter_items_one_closed_early(litman_dir):
+    expected = _names(LitMan(litman_dir).get_items())
+    litman = LitMan(litman_dir)
+    first = litman.iter_items()
+    second = litman.iter_items()
+    assert next(first).name == expected[0]
+    assert next(second).name == expected[0]
+    assert next(first).name == expected[1]
+    first.close()
+
+    assert [expected[0]] + _names(second) == expected
+    assert _names(litman.get_items()) == expected
+
+
+def test_iter_items_abandoned_consumer(litman_dir):
+    expected = _names(LitMan(litman_dir).get_items())
+    litman = LitMan(litman_dir)
+    second = litman.iter_items(tag_filter='even')
+    first = litman.iter_items()
+    for _, _ in zip(range(5), first):
+        pass
+    del first
+    gc.collect()
+
+    assert _names(second) == [name for name in expected if int(name[6:10]) % 2 == 0]
+    assert _names(litman.get_items()) == expected
+
+
+def test_nested_iter_items(litman_dir):
+    expected = _names(LitMan(litman_dir).get_items())
+    litman = LitMan(litman_dir)
+    outer = []
+    for item in litman.iter_items():
+        outer.append(item.name)
+        if len(outer) == 3:
+            # Stops partway through; the outer loop goes on from where it was.
+            inner = litman.iter_items()
+            assert [next(inner).name for _ in range(10)] == expected[:10]
+            inner.close()
+    assert outer == expected
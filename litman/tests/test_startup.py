@@ -0,0 +1,62 @@
+"""Startup cost of the command line tool.
+
+`litman version` (and the shell's tab completion, which takes the same path) should come back
+in under 80 ms. Interpreter startup varies a lot between machines (.pth files in site-packages
+can cost tens of ms), so it is measured here and only what litman adds on top is held to a
+budget: the 80 ms target less a typical 40 ms interpreter start.
+"""
+import os
+import subprocess as sp
+import sys
+import time
+from pathlib import Path
+
+LITMAN_BUDGET_MS = 40
+REPEATS = 5
+
+# None of these should be needed to print the version.
+HEAVY_MODULES = [
+    'litman.litman',
+    'concurrent.futures',
+    'multiprocessing',
+    'sqlite3',
+    'mmap',
+    'pybtex',
+    'requests',
+    'markdown',
+]
+
+VERSION_CODE = "import sys; from litman.litman_cmd import main; sys.exit(main(['litman', 'version']))"
+
+
+def _env(tmp_path):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = str(Path(__file__).parents[2])
+    env['HOME'] = str(tmp_path)
+    return env
+
+
+def _run(args, env):
+    start = time.perf_counter()
+    sp.run([sys.executable] + args, env=env, check=True, stdout=sp.DEVNULL, stderr=sp.PIPE)
+    return (time.perf_counter() - start) * 1000
+
+
+def test_version_imports(tmp_path):
+    proc = sp.run([sys.executable, '-X', 'importtime', '-c', VERSION_CODE],
+                  env=_env(tmp_path), check=True, stdout=sp.DEVNULL, stderr=sp.PIPE,
+                  universal_newlines=True)
+    # Lines look like: "import time:       123 |        456 |   some.module"
+    imported = {line.split('|')[-1].strip()
+                for line in proc.stderr.splitlines() if line.startswith('import time:')}
+    assert 'litman.litman_cmd' in imported
+    for name in HEAVY_MODULES:
+        assert name not in imported, f'{name} imported by `litman version`'
+
+
+def test_version_time(tmp_path):
+    env = _env(tmp_path)
+    bare_ms = min(_run(['-c', 'pass'], env) for _ in range(REPEATS))
+    version_ms = min(_run(['-c', VERSION_CODE], env) for _ in range(REPEATS))
+    assert version_ms - bare_ms < LITMAN_BUDGET_MS, \
+        f'`litman version` took {version_ms:.0f} ms ({bare_ms:.0f} ms for bare python)'
@@ -0,0 +1,88 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from litman import tag_query
+from litman.catalog import FLAGS
+from litman.item_index import ItemIndex
+from litman.tag_query import TagQueryError, parse, parse_filter
+
+TAGS = ['conv', 'obs', 'model', 'review', 'my tag']
+
+# (query, the same as a Python predicate over an item's tags)
+QUERIES = [
+    ('conv', lambda t: 'conv' in t),
+    ('conv AND obs', lambda t: 'conv' in t and 'obs' in t),
+    ('conv OR obs AND model', lambda t: 'conv' in t or ('obs' in t and 'model' in t)),
+    ('(conv OR obs) AND model', lambda t: ('conv' in t or 'obs' in t) and 'model' in t),
+    ('NOT conv AND obs', lambda t: 'conv' not in t and 'obs' in t),
+    ('NOT (conv AND obs)', lambda t: not ('conv' in t and 'obs' in t)),
+    ('NOT NOT review', lambda t: 'review' in t),
+    ('conv AND (obs OR model) AND NOT review',
+     lambda t: 'conv' in t and ('obs' in t or 'model' in t) and 'review' not in t),
+    ('"my tag" OR review', lambda t: 'my tag' in t or 'review' in t),
+    ('unknown', lambda t: False),
+    ('NOT unknown', lambda t: True),
+    ('unknown OR obs', lambda t: 'obs' in t),
+]
+
+
+def test_precedence():
+    a, b, c = ('tag', 'a'), ('tag', 'b'), ('tag', 'c')
+    assert parse('a OR b AND c') == ('or', [a, ('and', [b, c])])
+    assert parse('a AND b OR c') == ('or', [('and', [a, b]), c])
+    assert parse('NOT a AND b') == ('and', [('not', a), b])
+    assert parse('NOT a OR b') == ('or', [('not', a), b])
+    assert parse('a AND (b OR c)') == ('and', [a, ('or', [b, c])])
+    assert parse('NOT (a OR b)') == ('not', ('or', [a, b]))
+    assert parse('a AND b AND c') == ('and', [a, b, c])
+
+
+def test_quoting_and_keywords():
+    assert parse('"NOT" AND obs') == ('and', [('tag', 'NOT'), ('tag', 'obs')])
+    assert parse('"my tag"') == ('tag', 'my tag')
+    # Keywords are upper case only.
+    assert parse('not') == ('tag', 'not')
+
+
+@pytest.mark.parametrize('query', [
+    '(a OR b', 'a OR b)', '((a)', ')', '()', '(', 'a AND', 'AND a', 'a OR', 'NOT',
+    'a b', 'a (b)', '"a', 'a AND AND b',
+])
+def test_bad_expressions(query):
+    with pytest.raises(TagQueryError):
+        parse(query)
+
+
+def test_parse_filter_prefers_an_existing_tag():
+    assert parse_filter('my tag', {'my tag'}.__contains__) == ('tag', 'my tag')
+    with pytest.raises(TagQueryError):
+        parse_filter('my tag', set().__contains__)
+    assert parse_filter('a OR b', set().__contains__) == ('or', [('tag', 'a'), ('tag', 'b')])
+
+
+def _items(n):
+    rng = random.Random(0)
+    items = []
+    for i in range(n):
+        item = SimpleNamespace(name=f'item{i:03}', tags=rng.sample(TAGS, rng.randint(0, 3)))
+        for flag in FLAGS:
+            setattr(item, flag, False)
+        items.append(item)
+    return items
+
+
+@pytest.mark.parametrize('query,predicate', QUERIES)
+def test_bitmaps_match_per_item(query, predicate):
+    items = _items(200)
+    index = ItemIndex(items)
+    # A removed item must not match, not even NOT anything.
+    index.remove(items[7])
+    live = [item for item in items if item is not items[7]]
+
+    node = parse(query)
+    from_bits = index.select(tag_query.evaluate(node, index.tag_bits, index.live))
+    assert [item.name for item in from_bits] == \
+        [item.name for item in live if tag_query.matches(node, item.tags)] == \
+        [item.name for item in live if predicate(set(item.tags))]
@@ -0,0 +1,131 @@
+"""Reading and writing items' extracted text, optionally compressed.
+
+An item's text is in one of extracted_text.txt, extracted_text.txt.gz or
+extracted_text.txt.zst; readers go by the suffix, so a library can hold a mix
+while it is being converted (`litman compact-text`). New text is written with
+the library's `text_compression` (none, gzip or zstd; default none) from the
+[litman] section of .litmanrc.
+
+The file's bytes are compressed as they are, so decompressing gives back
+exactly what pdftotext wrote, and decoding it reads the same text (and so the
+same match offsets) as the uncompressed file would.
+
+zstd needs the zstandard package (``pip install -e .[zstd]``), or Python 3.14's
+compression.zstd.
+"""
+import io
+import os
+from logging import getLogger
+
+logger = getLogger('litman.text_store')
+
+TEXT_BASENAME = 'extracted_text.txt'
+SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+TEXT_BASENAMES = [TEXT_BASENAME + suffix for suffix in SUFFIXES.values()]
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+class _Gzip:
+    def compress(self, data):
+        import gzip
+        # mtime=0: the same text always compresses to the same bytes.
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+    def decompress(self, data):
+        import gzip
+        return gzip.decompress(data)
+
+
+class _Zstd:
+    def _module(self):
+        try:
+            from compression import zstd
+            return zstd, None
+        except ImportError:
+            pass
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('zstd text compression needs the zstandard package '
+                              '(pip install -e .[zstd])')
+        return None, zstandard
+
+    def compress(self, data):
+        zstd, zstandard = self._module()
+        if zstd is not None:
+            return zstd.compress(data, level=ZSTD_LEVEL)
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+    def decompress(self, data):
+        zstd, zstandard = self._module()
+        if zstd is not None:
+            return zstd.decompress(data)
+        return zstandard.ZstdDecompressor().decompress(data)
+
+
+_CODECS = {'.gz': _Gzip(), '.zst': _Zstd()}
+
+
+def check_compression(compression):
+    """compression, if it is known and usable here; raises otherwise."""
+    if compression not in SUFFIXES:
+        raise ValueError(f'unknown text_compression {compression!r}: '
+                         f'use one of {", ".join(SUFFIXES)}')
+    if compression == 'zstd':
+        _CODECS['.zst']._module()
+    return compression
+
+
+def compression_of(text_fn):
+    for compression, suffix in SUFFIXES.items():
+        if suffix and text_fn.endswith(suffix):
+            return compression
+    return 'none'
+
+
+def find_text_fn(item_dir):
+    """The extracted text file in item_dir, or the uncompressed name if there is none."""
+    for basename in TEXT_BASENAMES:
+        text_fn = os.path.join(item_dir, basename)
+        if os.path.exists(text_fn):
+            return text_fn
+    return os.path.join(item_dir, TEXT_BASENAME)
+
+
+def read_raw(text_fn):
+    """The uncompressed bytes of text_fn."""
+    with open(text_fn, 'rb') as f:
+        data = f.read()
+    codec = _CODECS.get(SUFFIXES[compression_of(text_fn)])
+    return data if codec is None else codec.decompress(data)
+
+
+def read_text(text_fn):
+    if compression_of(text_fn) == 'none':
+        with open(text_fn, 'r') as f:
+            return f.read()
+    # Decoded (and newlines translated) as open(text_fn, 'r') would.
+    return io.TextIOWrapper(io.BytesIO(read_raw(text_fn))).read()
+
+
+def store(text_fn, compression):
+    """Rewrite text_fn with compression, and return the new filename. Other
+    copies of the text in the same dir are removed."""
+    item_dir = os.path.dirname(text_fn)
+    new_fn = os.path.join(item_dir, TEXT_BASENAME + SUFFIXES[compression])
+    if new_fn != text_fn:
+        data = read_raw(text_fn)
+        codec = _CODECS.get(SUFFIXES[compression])
+        if codec is not None:
+            data = codec.compress(data)
+        tmp_fn = new_fn + '.tmp'
+        with open(tmp_fn, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_fn, new_fn)
+        logger.debug(f'stored {text_fn} as {new_fn}')
+    for basename in TEXT_BASENAMES:
+        fn = os.path.join(item_dir, basename)
+        if fn != new_fn and os.path.exists(fn):
+            os.remove(fn)
+    return new_fn
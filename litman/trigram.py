@@ -0,0 +1,107 @@
+"""Trigram queries for prefiltering regex search, as in Google Code Search.
+
+A regex can only match text that contains the literal strings it requires, and
+so every trigram of those strings. required_trigrams() works out, from the
+parsed pattern, an and/or tree of trigrams that any match must contain; items
+whose text lacks them are never read. The real regex is still run on the
+remaining candidates, so results are exactly those of a full scan.
+
+Only ASCII trigrams are used, lowercased: re.IGNORECASE lets a few non-ASCII
+characters match ASCII letters (e.g. the Kelvin sign matches k), so those are
+folded to the letter before indexing.
+"""
+import re
+from functools import lru_cache
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Non-ASCII characters that IGNORECASE matches to an ASCII letter, and which
+# str.lower() does not turn into that letter on its own.
+_FOLD = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's'})
+_ASCII_RUN_RE = re.compile(r'[\x00-\x7f]{3,}')
+_NON_ASCII_RE = re.compile(r'[^\x00-\x7f]')
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+            getattr(sre_constants, 'POSSESSIVE_REPEAT', None)}
+
+
+def fold(text):
+    # Not str.isascii(), which is Python 3.7+.
+    if _NON_ASCII_RE.search(text):
+        text = text.translate(_FOLD)
+    return text.lower()
+
+
+def trigram_code(trigram):
+    return (ord(trigram[0]) << 14) | (ord(trigram[1]) << 7) | ord(trigram[2])
+
+
+def text_trigrams(text):
+    """The set of (coded) ASCII trigrams in text."""
+    return {trigram_code(run[i:i + 3])
+            for run in _ASCII_RUN_RE.findall(fold(text)) for i in range(len(run) - 2)}
+
+
+def _literal_trigrams(literal):
+    return [('tri', trigram_code(literal[i:i + 3])) for i in range(len(literal) - 2)]
+
+
+def _and(nodes):
+    nodes = [node for node in nodes if node is not None]
+    if not nodes:
+        return None
+    return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+
+def _or(nodes):
+    if not nodes or any(node is None for node in nodes):
+        return None
+    return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+
+def _required(pattern):
+    """Query tree for a parsed (sub)pattern; None means no constraint."""
+    nodes = []
+    run = []
+
+    def flush():
+        if len(run) >= 3:
+            nodes.extend(_literal_trigrams(''.join(run)))
+        run.clear()
+
+    for op, av in pattern:
+        if op == sre_constants.LITERAL and av < 128:
+            run.append(fold(chr(av)))
+        elif op == sre_constants.AT:
+            # Zero width (^, $, \b): the literals either side are still adjacent.
+            pass
+        elif op == sre_constants.SUBPATTERN:
+            flush()
+            nodes.append(_required(av[-1]))
+        elif op in _REPEATS:
+            flush()
+            min_count, _, item = av
+            if min_count >= 1:
+                nodes.append(_required(item))
+        elif op == sre_constants.BRANCH:
+            flush()
+            nodes.append(_or([_required(branch) for branch in av[1]]))
+        else:
+            flush()
+    flush()
+    return _and(nodes)
+
+
+@lru_cache(maxsize=64)
+def required_trigrams(pattern, flags=0):
+    """And/or tree of ('tri', code) nodes that any match of pattern needs, or None."""
+    try:
+        return _required(sre_parse.parse(pattern, flags))
+    except Exception:
+        # Let re report a bad pattern; the prefilter just steps aside.
+        return None
@@ -0,0 +1,151 @@
+"""Watch a LitMan dir for changes, for `litman daemon`.
+
+InotifyWatcher uses Linux inotify (through ctypes, so there is nothing to install)
+on literature/ and each item dir in it. It records which items have seen events,
+so the daemon only re-reads those, without listing literature/ or statting the
+other items. projects/ and data/ are not watched: nothing the daemon serves is
+read from them, and data/ is where it writes its own caches. Elsewhere, or if
+inotify cannot be set up (e.g. fs.inotify.max_user_watches is too low),
+PollingWatcher is used instead: it reports a possible change every time, and
+LitMan.rescan works out what has changed from the mtimes.
+"""
+import os
+import ctypes
+import ctypes.util
+import struct
+from logging import getLogger
+
+logger = getLogger('litman.watch')
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')
+
+
+class PollingWatcher:
+    """Always dirty: each refresh is a full (mtime-based) rescan."""
+    dirty = True
+
+    def fileno(self):
+        return None
+
+    def read_events(self):
+        pass
+
+    def take(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, litman):
+        self.litman = litman
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch_fn = libc.inotify_add_watch
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # {watch descriptor: item name}; None for literature/.
+        self._watches = {}
+        self._names = set()
+        self._overflow = False
+        self.dirty = False
+        try:
+            self._lit_wd = self._add_watch(litman.lit_dir, None)
+            with os.scandir(litman.lit_dir) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        self._add_watch(entry.path, entry.name)
+        except OSError:
+            self.close()
+            raise
+        logger.debug(f'watching {len(self._watches)} dirs')
+
+    def _add_watch(self, path, name):
+        wd = self._add_watch_fn(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f'cannot watch {path}: {os.strerror(errno)}')
+        self._watches[wd] = name
+        return wd
+
+    def fileno(self):
+        return self._fd
+
+    def read_events(self):
+        """Drain the pending events; call when fileno() is readable."""
+        while True:
+            try:
+                buf = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _, name_len = _EVENT.unpack_from(buf, pos)
+                name = buf[pos + _EVENT.size:pos + _EVENT.size + name_len].rstrip(b'\0')
+                pos += _EVENT.size + name_len
+                self._handle(wd, mask, os.fsdecode(name))
+
+    def _handle(self, wd, mask, name):
+        self.dirty = True
+        if mask & IN_Q_OVERFLOW:
+            logger.warning('inotify queue overflowed; rebuilding all items')
+            self._overflow = True
+        elif mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+        elif wd == self._lit_wd:
+            if not name:
+                # literature/ itself was moved or deleted.
+                self._overflow = True
+            else:
+                self._names.add(name)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._add_watch(os.path.join(self.litman.lit_dir, name), name)
+                    except OSError as ex:
+                        # Already gone again, or out of watches: the next rescan sees it.
+                        logger.warning(ex)
+        elif self._watches.get(wd) is not None:
+            self._names.add(self._watches[wd])
+
+    def take(self):
+        """Names of the items that have seen events since the last take, or None if
+        events were lost and the whole library should be rescanned."""
+        names = None if self._overflow else self._names
+        self._names = set()
+        self._overflow = False
+        self.dirty = False
+        return names
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(litman):
+    """An InotifyWatcher if possible, otherwise a PollingWatcher."""
+    try:
+        return InotifyWatcher(litman)
+    except (OSError, AttributeError) as ex:
+        # AttributeError: no inotify functions in this libc (i.e. not Linux).
+        logger.warning(f'cannot use inotify ({ex}); polling for changes instead')
+        return PollingWatcher()
@@ -4,9 +4,21 @@ Produces a controlled vocabulary of the corpus: which terms appear, how often,
 and in which items. Useful as a discovery aid -- given a vague query, look up
 the real terms (and their frequencies) before grepping the extracted_text.txt
 files. Pure-local; no API calls.
+
+Tokenizing is most of the work, so each item's word counts are kept in a
+WordCountCache (<litman_dir>/data/word_counts.marshal, keyed by the text's
+mtime and size, as in bib_cache): a rebuild only reads the texts that are new or
+have changed since the last one.
 """
+import os
 import re
+import sys
 from collections import Counter, defaultdict
+from logging import getLogger
+
+from litman import marshal_cache
+
+logger = getLogger('litman.word_index')
 
 # A small, generic English stopword list plus a few PDF/academic-boilerplate words.
 STOPWORDS = set((
@@ -22,23 +34,89 @@ STOPWORDS = set((
 
 WORD_RE = re.compile(r"[a-z][a-z'\-]{2,}")
 
+WORD_COUNTS_BASENAME = 'word_counts.marshal'
+CACHE_VERSION = 1
+
+
+def count_words(text):
+    """{word: count} for the indexable words in text."""
+    local = Counter()
+    for m in WORD_RE.finditer(text.lower()):
+        w = m.group().strip("-'")
+        if len(w) < 3 or w in STOPWORDS:
+            continue
+        local[w] += 1
+    # Interned, so that marshal writes each word once however many items have it.
+    return {sys.intern(w): c for w, c in local.items()}
+
+
+class WordCountCache:
+    def __init__(self, cache_fn):
+        self.cache_fn = cache_fn
+        # {item name: (mtime_ns, size, {word: count})}
+        self._records = None
+        self._dirty = False
+        self.n_counted = 0
 
-def build_word_index(items, min_count=3):
-    """Return {word: {count, docs, items: [...]}} for words with total >= min_count."""
+    def __repr__(self):
+        return f"WordCountCache('{self.cache_fn}')"
+
+    def _load(self):
+        data = marshal_cache.load(self.cache_fn, CACHE_VERSION, 'word counts')
+        self._records = data['records'] if data else {}
+
+    def load(self, item):
+        """item's word counts, reading its text only if it has changed since they were cached."""
+        if self._records is None:
+            self._load()
+        try:
+            st = os.stat(item.extracted_text_fn)
+        except FileNotFoundError:
+            return {}
+        cached = self._records.get(item.name)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+
+        logger.debug(f'counting words in {item.extracted_text_fn}')
+        counts = count_words(item.read_extracted_text() or '')
+        self.n_counted += 1
+        if not marshal_cache.is_racy(st.st_mtime_ns):
+            self._records[item.name] = (st.st_mtime_ns, st.st_size, counts)
+            self._dirty = True
+        elif self._records.pop(item.name, None) is not None:
+            self._dirty = True
+        return counts
+
+    def save(self, keep_names=None):
+        """Write out the cache, first dropping any item not in keep_names (if given)."""
+        if self._records is None:
+            return
+        if keep_names is not None:
+            keep_names = set(keep_names)
+            for name in [name for name in self._records if name not in keep_names]:
+                del self._records[name]
+                self._dirty = True
+        if not self._dirty:
+            return
+        marshal_cache.save(self.cache_fn, CACHE_VERSION, records=self._records)
+        self._dirty = False
+        logger.debug(f'saved word counts for {len(self._records)} items to {self.cache_fn}')
+
+
+def build_word_index(items, min_count=3, cache=None):
+    """Return {word: {count, docs, items: [...]}} for words with total >= min_count.
+
+    With a WordCountCache, only the items whose text has changed are tokenized.
+    """
     freq = Counter()
     doc_freq = Counter()
     inverted = defaultdict(list)
 
     for item in items:
-        text = item.extracted_text()
-        if not text:
-            continue
-        local = Counter()
-        for m in WORD_RE.finditer(text.lower()):
-            w = m.group().strip("-'")
-            if len(w) < 3 or w in STOPWORDS:
-                continue
-            local[w] += 1
+        if cache is not None:
+            local = cache.load(item)
+        else:
+            local = count_words(item.read_extracted_text() or '')
         for w, c in local.items():
             freq[w] += c
             doc_freq[w] += 1
@@ -33,8 +33,8 @@ setup(
     maintainer_email='m.muetzelfeldt@pgr.reading.ac.uk',
     packages=['litman',
               'litman.cmds',
+              'litman.tests',
               ],
-              # 'litman.tests'],
     scripts=[
         'bin/litman',
         'bin/litman_web',
@@ -51,6 +51,7 @@ setup(
     extras_require= {
         'experimental': ['flask', 'graphviz'],
         'ai': ['anthropic'],
+        'zstd': ['zstandard'],
         },
     package_data={ },
     url='https://github.com/markmuetz/litman',